@@ -0,0 +1,278 @@
+import asyncio
+import json
+import time
+from operator import itemgetter
+from urllib.parse import urlencode
+from common import (get_client, request_params, request_target, body_size, backoff_delays, listing_complete, log,
+                    LIST_RETRY_INTERVAL, LIST_SETTLE_TIMEOUT)
+from recorder import get_recorder
+from metrics import METRICS
+from ratelimit import is_throttled
+from retry_policy import (OK, RETRYABLE, GONE, CONNECT_TIMEOUT, READ_TIMEOUT, RETRY_INTERVAL, RETRY_MAX_INTERVAL,
+                          ApiError, classify, should_retry, describe_failure)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# 是否为连接失败（含建立连接超时），只有连接失败才停用接入点，读取超时等其他错误不停用
+def connection_failed(e):
+    if isinstance(e, getattr(aiohttp, 'ConnectionTimeoutError', ())):
+        return True
+    return isinstance(e, aiohttp.ClientConnectionError) and not isinstance(e, asyncio.TimeoutError)
+
+# 异步HTTP客户端：基于aiohttp连接池，单个事件循环即可维持大量在途请求，不需要为每个请求占用线程；
+# 与同步客户端共用缓存的cookie/token和限流器
+class AsyncApiClient:
+    def __init__(self, pool_size=100, timeout=None, limiter=None):
+        if aiohttp is None:
+            raise RuntimeError("异步模式需要安装 aiohttp 库: pip3 install aiohttp")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.limiter = limiter or get_client().limiter
+        # 与同步客户端共用接入点的延迟和停用状态；aiohttp的连接池同样按主机划分
+        self.router = get_client().router
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.pool_size)
+        # 未指定总超时时分别限制连接和读取的超时时间
+        if self.timeout:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+        else:
+            timeout = aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        # 在线程中探测接入点，不阻塞事件循环
+        await asyncio.get_running_loop().run_in_executor(None, self.router.ensure_probed)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    # 获取通用HTTP头
+    def headers(self):
+        return dict(get_client().headers())
+
+    # 发送POST请求并返回JSON响应，按与同步客户端相同的重试策略退避重试，请求失败时返回None；
+    # data为表单参数，json_body为JSON参数
+    async def post_request(self, url, data=None, json_body=None, headers=None):
+        headers = headers or self.headers()
+        if data is not None and not isinstance(data, str):
+            data = urlencode(data)
+            headers = dict(headers, **{'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'})
+        action, region = request_target(url, data, json_body)
+        delays = backoff_delays(RETRY_INTERVAL, RETRY_MAX_INTERVAL)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            body, category, error = await self.post_once(url, data, json_body, headers, action, region)
+            if not should_retry(category, attempt, time.monotonic() - started):
+                if category not in (OK, GONE):
+                    log(f"{action} 失败（第{attempt}次请求）: {error}")
+                return body
+            delay = next(delays)
+            METRICS.record_retry(action)
+            METRICS.record_sleep('retry', delay)
+            await asyncio.sleep(delay)
+
+    # 发送一次POST请求，返回(响应内容, 结果分类, 错误信息)
+    async def post_once(self, url, data, json_body, headers, action, region):
+        sent = body_size(data if json_body is None else json.dumps(json_body))
+        recorder = get_recorder()
+        try:
+            async with self.limiter.limit_async(action, region) as report:
+                # 失败的接入点被停用，重试时改用其他接入点
+                endpoint, target = self.router.route(url, region)
+                # 只统计网络请求本身的耗时，不含限流等待
+                started = time.monotonic()
+                try:
+                    async with self.session.post(target, data=data, json=json_body, headers=headers) as response:
+                        content = await response.read()
+                except Exception as e:
+                    if connection_failed(e):
+                        get_client().endpoint_failed(endpoint, str(e) or type(e).__name__)
+                    METRICS.record_request(action, time.monotonic() - started, sent, error=True)
+                    if recorder is not None:
+                        recorder.record(request_params(url, data, json_body), None, None,
+                                        time.monotonic() - started, str(e) or type(e).__name__)
+                    raise
+                try:
+                    body = json.loads(content)
+                except ValueError:
+                    body = None
+                seconds = time.monotonic() - started
+                if response.status >= 500:
+                    get_client().endpoint_failed(endpoint, f"HTTP {response.status}")
+                else:
+                    self.router.succeeded(endpoint, region, seconds)
+                failed = response.status >= 400 or not isinstance(body, dict) or body.get('RetCode', 0) != 0
+                METRICS.record_request(action, seconds, sent, len(content), failed)
+                if recorder is not None:
+                    recorder.record(request_params(url, data, json_body), response.status,
+                                    content.decode('utf-8', 'replace') if body is None else body, seconds)
+                report(is_throttled(response.status, body))
+        except asyncio.TimeoutError:
+            return None, RETRYABLE, "请求超时，请检查网络连接或服务器状态。"
+        except aiohttp.ClientError as e:
+            return None, RETRYABLE, f"请求失败: {e}"
+        category = classify(response.status, body)
+        if response.status >= 400:
+            return None, category, f"请求失败: HTTP {response.status}"
+        if body is None:
+            return None, category, f"JSON解析失败: {content[:200]}"
+        return body, category, describe_failure(body)
+
+# page_fetcher的协程版本
+def page_fetcher_async(client, url, data):
+    async def fetch_page(offset, limit):
+        query = dict(data, Offset=offset, Limit=limit, _timestamp=int(time.time() * 1000))
+        return await client.post_request(url, query)
+    return fetch_page
+
+# iter_pages的协程版本：第一页返回后根据TotalCount并发获取其余分页，按完成顺序逐页返回
+async def iter_pages_async(fetch_page, set_key, limit):
+    first = await fetch_page(0, limit)
+    if first is None or set_key not in first:
+        raise ApiError(f"查询失败: {describe_failure(first)}")
+    page = first[set_key] or []
+    total = first.get('TotalCount')
+    yield page, total
+
+    if total is None:
+        offset = limit
+        while len(page) >= limit:
+            response = await fetch_page(offset, limit)
+            if response is None or set_key not in response:
+                raise ApiError(f"查询失败: {describe_failure(response)}")
+            page = response[set_key] or []
+            yield page, total
+            offset += limit
+        return
+
+    # 服务端每页返回的数量上限小于limit时，按实际每页数量计算其余分页的偏移量
+    if 0 < len(page) < min(limit, total):
+        limit = len(page)
+    for task in asyncio.as_completed([fetch_page(offset, limit) for offset in range(limit, total, limit)]):
+        response = await task
+        if response is None or set_key not in response:
+            raise ApiError(f"查询失败: {describe_failure(response)}")
+        yield response[set_key] or [], total
+
+# list_resources的协程版本，逐个返回资源（按id_key去重），重新查询直到某一轮查询到的资源数量达到TotalCount
+async def list_resources_async(fetch_page, set_key, id_key, limit):
+    key = id_key if callable(id_key) else itemgetter(id_key)
+    seen = set()
+    deadline = None
+    while True:
+        listed = set()
+        found = 0
+        pages = 0
+        total = None
+        async for page, total in iter_pages_async(fetch_page, set_key, limit):
+            pages += 1
+            for item in page:
+                resource_id = key(item)
+                listed.add(resource_id)
+                if resource_id not in seen:
+                    seen.add(resource_id)
+                    found += 1
+                    yield item
+        if listing_complete(listed, total, pages, found):
+            return
+        if found:
+            deadline = None
+            continue
+        if deadline is None:
+            deadline = time.monotonic() + LIST_SETTLE_TIMEOUT
+        elif time.monotonic() > deadline:
+            raise ApiError(f"查询失败: 资源列表持续变化，{LIST_SETTLE_TIMEOUT}秒内未能查询完整（共{total}个，查询到{len(listed)}个）")
+        METRICS.record_sleep('poll', LIST_RETRY_INTERVAL)
+        await asyncio.sleep(LIST_RETRY_INTERVAL)
+
+# run_pipeline的协程版本：从异步迭代器items中取出元素放入有界队列，由workers个协程并发处理。
+# 返回(handle返回真值的元素列表, 元素总数)
+async def run_pipeline_async(items, handle, workers=4, queue_size=None):
+    tasks = asyncio.Queue(maxsize=queue_size or workers * 2)
+    stop = object()
+    done = []
+
+    async def worker():
+        while True:
+            item = await tasks.get()
+            if item is stop:
+                return
+            try:
+                if await handle(item):
+                    done.append(item)
+            except Exception as e:
+                log(f"处理 {item} 时发生错误: {e}")
+
+    consumers = [asyncio.ensure_future(worker()) for _ in range(max(1, workers))]
+    count = 0
+    try:
+        if hasattr(items, '__aiter__'):
+            async for item in items:
+                await tasks.put(item)
+                count += 1
+        else:
+            for item in items:
+                await tasks.put(item)
+                count += 1
+    finally:
+        for _ in consumers:
+            await tasks.put(stop)
+        await asyncio.gather(*consumers)
+    return done, count
+
+# wait_until的协程版本，check为协程函数
+async def wait_until_async(check, timeout=300, interval=0.5, max_interval=10):
+    deadline = time.monotonic() + timeout
+    for delay in backoff_delays(interval, max_interval):
+        if await check():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        delay = min(delay, remaining)
+        METRICS.record_sleep('poll', delay)
+        await asyncio.sleep(delay)
+
+# run_graph的协程版本：每个节点等待其依赖节点完成后执行，max_concurrency限制同时执行的节点数
+async def run_graph_async(graph, run, max_concurrency=None, on_done=None):
+    for node, deps in graph.items():
+        for dep in deps:
+            if dep not in graph:
+                raise ValueError(f"节点 {node} 依赖的 {dep} 不存在")
+    # 检查依赖关系是否存在环，避免协程互相等待
+    remaining = {node: set(deps) for node, deps in graph.items()}
+    while remaining:
+        ready = [node for node, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"依赖关系存在环: {', '.join(str(node) for node in remaining)}")
+        for node in ready:
+            del remaining[node]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+    events = {node: asyncio.Event() for node in graph}
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    results = {}
+
+    async def execute(node):
+        try:
+            for dep in graph[node]:
+                await events[dep].wait()
+            if semaphore is None:
+                results[node] = await run(node)
+            else:
+                async with semaphore:
+                    results[node] = await run(node)
+            if on_done is not None:
+                on_done(node, results[node])
+        finally:
+            events[node].set()
+
+    await asyncio.gather(*(execute(node) for node in graph))
+    return results
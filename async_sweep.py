@@ -0,0 +1,334 @@
+import asyncio
+import time
+from common import api_url, log, start_log_buffer, stop_log_buffer, supports_batch, ARRAY_PARAMS, BATCH_SIZE
+from async_client import (AsyncApiClient, page_fetcher_async, list_resources_async,
+                          run_pipeline_async, wait_until_async, run_graph_async)
+from journal import Journal
+from inventory import InventoryCache
+from ratelimit import CONCURRENCY
+from retry_policy import ApiError, describe_failure, succeeded
+from resources import RESOURCES, action_params, describe_query, resource_label
+from filters import get_filter
+from records import parse_response, record_id
+from main import (RESOURCE_GRAPH, DELETE_WORKERS, WAIT_TIMEOUT, load_regions, collect_result,
+                  should_skip, record_outcome, print_summary, plan_regions, planned_ids)
+
+# 调用指定接口
+async def call_action(client, action, params):
+    data = dict(params, Action=action, _timestamp=int(time.time() * 1000))
+    return await client.post_request(api_url(action), data)
+
+# record_fetcher的协程版本：每页收到后立即解析为资源记录
+def record_fetcher_async(fetch_page, name, region):
+    async def fetch(offset, limit):
+        return parse_response(await fetch_page(offset, limit), name, region)
+    return fetch
+
+# 分页查询满足过滤规则的资源ID
+async def iter_ids_async(client, name, project_id, region):
+    spec = RESOURCES[name]
+    url = api_url(spec['describe'])
+    rules = get_filter()
+    query = dict(describe_query(spec, project_id, region), **rules.query_params(spec))
+    fetch_page = record_fetcher_async(page_fetcher_async(client, url, query), name, region)
+    skipped = 0
+    async for record in list_resources_async(fetch_page, spec['set_key'], record_id, spec['limit']):
+        rules.remember(record)
+        if rules.matches(record):
+            yield record.id
+        else:
+            skipped += 1
+    if skipped:
+        log(f"按过滤规则跳过 {skipped} 个资源")
+
+# wait_for_resources的协程版本
+async def wait_for_resources_async(client, name, project_id, region, ids, state=None, timeout=WAIT_TIMEOUT):
+    spec = RESOURCES[name]
+    pending = set(ids)
+    if not pending:
+        return True
+    set_key = spec['set_key']
+    query = describe_query(spec, project_id, region)
+
+    async def describe_pending():
+        if not supports_batch(spec['describe']):
+            url = api_url(spec['describe'])
+            fetch_page = record_fetcher_async(page_fetcher_async(client, url, query), name, region)
+            try:
+                return [record async for record in list_resources_async(fetch_page, set_key, record_id, spec['limit'])], set()
+            except ApiError:
+                return [], set(pending)
+
+        # 按ID分组并发查询尚未完成的资源
+        ids = sorted(pending)
+        chunks = [ids[start:start + BATCH_SIZE] for start in range(0, len(ids), BATCH_SIZE)]
+        template = ARRAY_PARAMS[spec['describe']]
+
+        async def describe_chunk(chunk):
+            params = dict(query, Offset=0, Limit=BATCH_SIZE)
+            del params['Action']
+            for i, resource_id in enumerate(chunk):
+                params[template.format(i)] = resource_id
+            return chunk, await call_action(client, spec['describe'], params)
+
+        records = []
+        unknown = set()
+        for chunk, response in await asyncio.gather(*(describe_chunk(chunk) for chunk in chunks)):
+            response = parse_response(response, name, region)
+            if response is None or set_key not in response:
+                unknown.update(chunk)
+            else:
+                records.extend(response[set_key])
+        return records, unknown
+
+    async def check():
+        records, remaining = await describe_pending()
+        for record in records:
+            if record.id in pending and (state is None or record.state != state):
+                remaining.add(record.id)
+        pending.intersection_update(remaining)
+        return not pending
+
+    if await wait_until_async(check, timeout):
+        return True
+    log(f"等待{resource_label(name)}{'进入' + state + '状态' if state else '删除完成'}超时（{timeout}秒）")
+    return False
+
+# main.delete_resources的协程版本：边查询边由多个协程并发删除，随后等待资源从列表中消失。
+# 返回(删除数量, 查询到的数量, 是否确认删除完成)，查询失败时查询到的数量为None
+async def delete_resources_async(client, project_id, region, zone, name, journal=None, ids=None):
+    spec = RESOURCES[name]
+    label = resource_label(name)
+    workers = DELETE_WORKERS[name]
+    log(f"正在查询{label}列表...")
+
+    async def call(action, params, resource_id):
+        return await call_action(client, action, action_params(spec, action, params, project_id, region, zone, resource_id))
+
+    async def delete_one(resource_id):
+        if journal is not None and journal.is_done(region, name, resource_id):
+            log(f"{name} {resource_id} 已在上次运行中删除，跳过")
+            return True
+        log(f"正在删除{label}: {resource_id}")
+        response = await call(spec['delete'], spec['delete_params'], resource_id)
+        ok = succeeded(response)
+        if journal is not None:
+            journal.record(region, name, resource_id, spec['delete'], 'ok' if ok else 'failed', None if ok else describe_failure(response))
+        return ok
+
+    deleted = []
+    found = None
+    settled = False
+    try:
+        # 执行删除计划时直接使用计划中的资源ID，否则分页查询
+        if ids is None:
+            ids = iter_ids_async(client, name, project_id, region)
+        poweroff = spec.get('poweroff')
+        if poweroff:
+            # 先关机，确认关机后再删除
+            async def poweroff_one(resource_id):
+                log(f"正在关机{label}: {resource_id}")
+                await call(poweroff['action'], {}, resource_id)
+                return True
+
+            ids, found = await run_pipeline_async(ids, poweroff_one, workers)
+            if found:
+                log(f"\n等待{label}关机...")
+                await wait_for_resources_async(client, name, project_id, region, ids, state=poweroff['state'])
+            deleted, _ = await run_pipeline_async(ids, delete_one, workers)
+        else:
+            deleted, found = await run_pipeline_async(ids, delete_one, workers)
+
+        if not found:
+            log(f"未找到任何{label}")
+            return 0, 0, True
+
+        # 等待已删除的资源从列表中消失，依赖它的资源才能继续删除
+        settled = await wait_for_resources_async(client, name, project_id, region, deleted)
+    except Exception as e:
+        log(f"在删除{label}时发生错误: {e}")
+
+    log(f"所有{label}删除操作已完成！")
+    return len(deleted), found, settled
+
+# 在单个地域内删除一种资源，返回删除数量、错误信息和日志
+async def sweep_resource_async(client, project_id, region, region_info, name, journal=None, cache=None, ids=None):
+    start_log_buffer()
+    count = 0
+    errors = []
+    if should_skip(project_id, region_info, name, journal, cache):
+        return count, errors, stop_log_buffer()
+    try:
+        count, found, settled = await delete_resources_async(client, project_id, region_info['Region'], region_info['Zone'], name, journal, ids)
+        record_outcome(project_id, region_info, name, count, found, settled, journal, cache)
+        if found is None:
+            errors.append(f"{name}列表查询失败")
+    except Exception as e:
+        log(f"在操作地域 {region} 删除{name}时发生错误: {e}")
+        errors.append(str(e))
+    return count, errors, stop_log_buffer()
+
+# main.main的协程版本：所有地域、所有资源类型在同一个事件循环中按依赖关系并发执行
+async def sweep_async(project_id, regions_data, resume=False, refresh=False, plan=None):
+    results = {region: {'counts': {}, 'errors': []} for region in regions_data}
+    journal = Journal(resume=resume, project_id=project_id)
+    cache = InventoryCache(scope=get_filter().fingerprint()) if plan is None else None
+    if refresh and cache is not None:
+        cache.invalidate(project_id)
+
+    graph = {}
+    for region in regions_data:
+        for name, (_, deps) in RESOURCE_GRAPH.items():
+            graph[(region, name)] = [(region, dep) for dep in deps]
+
+    async with AsyncApiClient(pool_size=CONCURRENCY) as client:
+        async def run(node):
+            region, name = node
+            ids = None if plan is None else planned_ids(plan, region, name)
+            return await sweep_resource_async(client, project_id, region, regions_data[region], name, journal, cache, ids)
+
+        def on_done(node, result):
+            collect_result(regions_data, results, node, result)
+
+        try:
+            await run_graph_async(graph, run, on_done=on_done)
+        finally:
+            journal.close()
+            if cache is not None:
+                cache.save()
+    return results
+
+# 同步入口：以异步方式执行 main.py 的全部删除流程；verify、requeue与 main.main 相同，校验在事件循环结束后执行
+def run_sweep(project_id, resume=False, refresh=False, plan=None, verify=False, requeue=False):
+    regions_data = load_regions() if plan is None else plan_regions(plan)
+    if regions_data is None:
+        return
+    results = asyncio.run(sweep_async(project_id, regions_data, resume, refresh, plan))
+    print_summary(results)
+    print("所有操作已完成")
+    if verify or requeue:
+        from verify import verify_sweep
+        leaks = verify_sweep(project_id, regions_data, plan, requeue)
+        for region, result in results.items():
+            result['leaked'] = leaks.get(region, {})
+    return results
+
+# ugn_clean.py 中 list_ugns 的协程版本
+async def list_ugns_async(client, project_id, region, zone):
+    url = api_url('ListUGN')
+
+    async def fetch_page(offset, limit):
+        payload = {
+            "ProjectId": project_id,
+            "Zone": zone,
+            "Region": region,
+            "Limit": limit,
+            "Offset": offset,
+            "Action": "ListUGN",
+            "_timestamp": int(time.time() * 1000)
+        }
+        return await client.post_request(url, json_body=payload)
+
+    return [ugn['UGNID'] async for ugn in list_resources_async(fetch_page, 'UGNs', 'UGNID', 100)]
+
+# ugn_clean.py 中 get_networks 的协程版本
+async def get_networks_async(client, project_id, region, zone, ugnid):
+    payload = {
+        "ProjectId": project_id,
+        "Zone": zone,
+        "Region": region,
+        "UGNID": ugnid,
+        "Action": "GetUGNNetworks",
+        "_timestamp": int(time.time() * 1000)
+    }
+    data = await client.post_request(api_url('GetUGNNetworks'), json_body=payload)
+    if not succeeded(data):
+        log(f"查询 UGN {ugnid} 绑定网络实例失败")
+        return None
+    return [net['NetworkID'] for net in data.get('Networks', [])]
+
+# ugn_clean.py 中 detach_networks 的协程版本
+async def detach_networks_async(client, project_id, region, ugnid, networks):
+    params = {
+        "ProjectId": project_id,
+        "Region": region,
+        "UGNID": ugnid,
+    }
+    for i, net in enumerate(networks):
+        params[f'Networks[{i}]'] = net
+    data = await call_action(client, 'DetachUGNNetworks', params)
+    if succeeded(data):
+        log(f"UGN {ugnid} 解绑成功")
+        return True
+    log(f"UGN {ugnid} 解绑失败: {data}")
+    return False
+
+# ugn_clean.py 中 del_ugn 的协程版本
+async def del_ugn_async(client, project_id, region, zone, ugnid):
+    payload = {
+        "ProjectId": project_id,
+        "Zone": zone,
+        "Region": region,
+        "UGNID": ugnid,
+        "Action": "DelUGN",
+        "_timestamp": int(time.time() * 1000)
+    }
+    if succeeded(await client.post_request(api_url('DelUGN'), json_body=payload)):
+        log(f"UGN {ugnid} 删除成功")
+        return True
+    log(f"UGN {ugnid} 删除最终失败，请手动检查！")
+    return False
+
+# 解绑并删除单个 UGN；出错时只记为该 UGN 失败，不影响其他 UGN
+async def clean_ugn_async(client, project_id, region, zone, ugnid):
+    try:
+        networks = await get_networks_async(client, project_id, region, zone, ugnid)
+        if networks is None:
+            return False
+        if networks:
+            await detach_networks_async(client, project_id, region, ugnid, networks)
+
+            async def detached():
+                return await get_networks_async(client, project_id, region, zone, ugnid) == []
+
+            if not await wait_until_async(detached, timeout=120):
+                log(f"等待 UGN {ugnid} 解绑超时")
+        return await del_ugn_async(client, project_id, region, zone, ugnid)
+    except Exception as e:
+        log(f"处理 UGN {ugnid} 时发生错误: {e}")
+        return False
+
+# ugn_clean.main的协程版本：各地域的 UGN 并发查询，每个 UGN 查询到后立即独立执行解绑和删除
+# targets 为 [(Region, Zone), ...]
+async def clean_ugns_async(project_id, targets):
+    async with AsyncApiClient(pool_size=CONCURRENCY) as client:
+        async def clean_region(region, zone):
+            try:
+                ugns = await list_ugns_async(client, project_id, region, zone)
+            except ApiError as e:
+                print(f"查询地域 {region} 的 UGN 列表失败: {e}")
+                return []
+            if not ugns:
+                print(f"地域 {region} 未找到任何 UGN")
+                return []
+            print(f"地域 {region} 找到以下 UGN：")
+            print('\n'.join(ugns))
+            results = await asyncio.gather(*(clean_ugn_async(client, project_id, region, zone, ugnid) for ugnid in ugns),
+                                           return_exceptions=True)
+            return [result is True for result in results]
+
+        # 单个地域出错不影响其他地域
+        results = await asyncio.gather(*(clean_region(region, zone) for region, zone in targets), return_exceptions=True)
+        for (region, _), result in zip(targets, results):
+            if isinstance(result, BaseException):
+                print(f"清理地域 {region} 的 UGN 时发生错误: {result}")
+        return [[] if isinstance(result, BaseException) else result for result in results]
+
+# 同步入口：以异步方式执行 ugn_clean.py 的解绑和删除流程
+def run_ugn_clean(project_id, targets):
+    results = asyncio.run(clean_ugns_async(project_id, targets))
+    print("\n================ UGN 删除汇总 ================")
+    for (region, _), region_results in zip(targets, results):
+        if region_results:
+            print(f"{region}: 成功 {sum(1 for ok in region_results if ok)} 个，失败 {sum(1 for ok in region_results if not ok)} 个")
+    print("所有 UGN 解绑和删除操作已完成！")
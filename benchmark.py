@@ -0,0 +1,262 @@
+import argparse
+import contextlib
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+
+import common
+import main
+import ugn_clean
+from common import configure_client
+from metrics import METRICS
+from ratelimit import CONCURRENCY
+
+# 端到端压测：针对本地模拟服务（mock_server.py）计时运行 main.main 和 ugn_clean.main，
+# 统计总耗时、每秒请求数和内存占用随时间的变化
+
+# 压测结果的默认输出文件
+RESULT_FILE = 'benchmark_result.json'
+# 采样内存占用和请求数的间隔（秒）
+SAMPLE_INTERVAL = 0.2
+# 等待模拟服务启动的最长时间（秒）
+STARTUP_TIMEOUT = 30
+
+# cli.py 不访问API的命令（查看帮助等）从启动进程到退出的耗时上限（秒），超过时压测以失败退出
+STARTUP_BUDGET = 0.2
+# 测量启动耗时的命令，这些命令都不应导入 requests
+STARTUP_COMMANDS = (('--help',), ('sweep', '--help'), ('ugn', '--help'), ('plan', '--help'), ('report', '--help'))
+
+# 获取一个空闲端口
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+# 查询模拟服务的调用统计和剩余资源数量
+def mock_stats(url):
+    with urllib.request.urlopen(url + 'stats', timeout=10) as resp:
+        return json.loads(resp.read())
+
+# 在子进程中启动模拟服务，避免与被测脚本争用GIL；mock_args为传给 mock_server.py 的参数
+def start_mock(regions, mock_args):
+    port = free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_server.py')
+    process = subprocess.Popen([sys.executable, script, '--port', str(port), '--regions', *regions, *mock_args],
+                               stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while True:
+        try:
+            mock_stats(url)
+            return process, url
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("模拟服务启动失败")
+            time.sleep(0.1)
+
+# 后台采样：定时记录(已运行秒数, 当前内存占用, 已发送请求数)
+class Sampler:
+    def __init__(self, interval=SAMPLE_INTERVAL, memory=True):
+        self.interval = interval
+        self.memory = memory
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        current = tracemalloc.get_traced_memory()[0] if self.memory else None
+        self.samples.append((round(time.monotonic() - self.started, 3), current, METRICS.calls()))
+
+    def __enter__(self):
+        if self.memory:
+            tracemalloc.start()
+        self.started = time.monotonic()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+        self.peak = tracemalloc.get_traced_memory()[1] if self.memory else None
+        if self.memory:
+            tracemalloc.stop()
+
+# 在临时目录中准备脚本运行所需的文件：占位的cookie和token，以及模拟地域的 region.json
+def prepare_workdir(workdir, regions):
+    for name in ('header.txt', 'token.txt'):
+        with open(os.path.join(workdir, name), 'w') as f:
+            f.write('mock')
+    regions_data = {f"模拟地域{i}": {'Region': region, 'Zone': f"{region}-01"} for i, region in enumerate(regions, 1)}
+    with open(os.path.join(workdir, 'region.json'), 'w', encoding='utf-8') as f:
+        json.dump(regions_data, f, ensure_ascii=False)
+    return [(info['Region'], info['Zone']) for info in regions_data.values()]
+
+# 执行被测脚本
+def run_target(target, project_id, targets, use_async):
+    if target == 'ugn':
+        if use_async:
+            from async_sweep import run_ugn_clean
+            run_ugn_clean(project_id, targets)
+        else:
+            ugn_clean.main(project_id, targets)
+    elif use_async:
+        from async_sweep import run_sweep
+        run_sweep(project_id)
+    else:
+        main.main(project_id)
+
+# 被测脚本应当删除却仍然剩余的资源数量：ugn 只统计UGN，sweep 统计UGN以外的资源
+def left_count(target, remaining):
+    return sum(count for kind, count in remaining.items() if (kind == 'UGN') == (target == 'ugn'))
+
+# 最终失败的请求数：失败后没有再重试的请求（重试次数用尽或不可重试）
+def failed_calls(report):
+    return sum(max(0, stats['errors'] - stats['retries']) for stats in report['actions'].values())
+
+# 执行一轮压测：启动新的模拟服务，在临时目录中依次运行各被测脚本，返回每个脚本的结果
+def run_once(args, mock_args):
+    regions = [f"mock-{i}" for i in range(1, args.regions + 1)]
+    steps = ['ugn', 'sweep'] if args.target == 'all' else [args.target]
+    # 只压测资源删除时不生成UGN，否则VPC因仍绑定UGN而无法删除
+    if args.target == 'sweep' and '--ugns' not in mock_args:
+        mock_args = [*mock_args, '--ugns', '0']
+    process, url = start_mock(regions, mock_args)
+    cwd = os.getcwd()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            targets = prepare_workdir(workdir, regions)
+            os.chdir(workdir)
+            common.API_URL = url
+            for step in steps:
+                METRICS.reset()
+                configure_client(pool_size=CONCURRENCY)
+                before = mock_stats(url)
+                with open(os.devnull, 'w') as devnull:
+                    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+                    with output, Sampler(memory=not args.no_memory) as sampler:
+                        started = time.monotonic()
+                        run_target(step, args.project_id, targets, args.use_async)
+                        elapsed = time.monotonic() - started
+                after = mock_stats(url)
+                calls = after['calls'] - before['calls']
+                report = METRICS.report()
+                results.append({
+                    'target': step,
+                    'async': args.use_async,
+                    'wall_seconds': round(elapsed, 3),
+                    'calls': calls,
+                    'calls_per_second': round(calls / elapsed, 2) if elapsed else 0,
+                    'peak_memory': sampler.peak,
+                    'throttled': after['throttled'] - before['throttled'],
+                    'injected_errors': after['errors'] - before['errors'],
+                    'remaining': after['remaining'],
+                    'left': left_count(step, after['remaining']),
+                    'failed_calls': failed_calls(report),
+                    'samples': sampler.samples,
+                    'metrics': report,
+                })
+    finally:
+        os.chdir(cwd)
+        process.terminate()
+        process.wait()
+    return results
+
+# 测量 cli.py 各命令的启动耗时中位数（含解释器启动），并通过 -X importtime 检查是否导入了 requests
+def measure_startup(repeat):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+    results = []
+    for command in STARTUP_COMMANDS:
+        walls = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, script, *command], stdout=subprocess.DEVNULL, check=True)
+            walls.append(time.perf_counter() - started)
+        imports = subprocess.run([sys.executable, '-X', 'importtime', script, *command],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+        modules = {line.rsplit('|', 1)[-1].strip() for line in imports.splitlines()}
+        results.append({
+            'command': ' '.join(command),
+            'wall_seconds': round(statistics.median(walls), 4),
+            'modules': len(modules),
+            'imports_requests': 'requests' in modules,
+        })
+    return results
+
+# 输出启动耗时，超过上限或导入了 requests 时返回False
+def print_startup(results):
+    print("\n================ 启动耗时 ================")
+    passed = True
+    for result in results:
+        problems = []
+        if result['wall_seconds'] > STARTUP_BUDGET:
+            problems.append(f"超过上限 {STARTUP_BUDGET}s")
+        if result['imports_requests']:
+            problems.append("导入了 requests")
+        passed = passed and not problems
+        print(f"cli.py {result['command']}: {result['wall_seconds'] * 1000:.1f}ms，导入 {result['modules']} 个模块"
+              + (f"（{'，'.join(problems)}）" if problems else ''))
+    return passed
+
+# 输出各轮压测结果及耗时中位数，有剩余资源或最终失败的请求时返回False
+def print_results(runs):
+    print("\n================ 压测结果 ================")
+    by_target = {}
+    passed = True
+    for i, results in enumerate(runs, 1):
+        for result in results:
+            by_target.setdefault(result['target'], []).append(result['wall_seconds'])
+            peak = f"{result['peak_memory'] / 1024 / 1024:.1f}MB" if result['peak_memory'] is not None else '-'
+            passed = passed and not result['left'] and not result['failed_calls']
+            print(f"第{i}轮 {result['target']}: 耗时 {result['wall_seconds']}s，请求 {result['calls']} 次，"
+                  f"{result['calls_per_second']} 次/秒，内存峰值 {peak}，被限流 {result['throttled']} 次，"
+                  f"失败请求 {result['failed_calls']} 次，剩余资源 {result['left']} 个")
+    for target, walls in by_target.items():
+        print(f"{target} 耗时中位数: {statistics.median(walls):.3f}s（共{len(walls)}轮）")
+    if not passed:
+        print("压测失败: 存在剩余资源或失败的请求")
+    return passed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='针对本地模拟服务压测资源删除脚本，未识别的参数（如 --count、--latency、--page-size、'
+                    '--throttle-rate、--error-rate）传给 mock_server.py')
+    parser.add_argument('--target', choices=['sweep', 'ugn', 'all', 'startup'], default='all',
+                        help='压测的脚本，all 表示先清理UGN再删除其他资源，startup 测量 cli.py 的启动耗时')
+    parser.add_argument('--regions', type=int, default=2, help='模拟的地域数量')
+    parser.add_argument('--repeat', type=int, default=1, help='重复压测的轮数')
+    parser.add_argument('--project-id', default='org-mock')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='使用异步客户端（需安装 aiohttp）')
+    parser.add_argument('--no-memory', action='store_true', help='不统计内存占用（tracemalloc 会使脚本变慢）')
+    parser.add_argument('--verbose', action='store_true', help='输出被测脚本的日志')
+    parser.add_argument('--output', default=RESULT_FILE, help='压测结果（JSON）的输出文件，默认 %(default)s')
+    args, mock_args = parser.parse_known_args()
+
+    if args.target == 'startup':
+        results = measure_startup(max(args.repeat, 5))
+        passed = print_startup(results)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"压测结果已写入 {args.output}")
+        raise SystemExit(0 if passed else 1)
+
+    runs = [run_once(args, mock_args) for _ in range(args.repeat)]
+    passed = print_results(runs)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(runs, f, ensure_ascii=False, indent=2)
+    print(f"压测结果已写入 {args.output}")
+    raise SystemExit(0 if passed else 1)
@@ -0,0 +1,203 @@
+import argparse
+import sys
+import time
+
+# 统一的命令行入口，子命令：sweep（删除资源）、ugn（解绑并删除UGN）、plan（生成删除计划）、report（查看运行报告）；
+# 各子命令用到的模块（requests、资源删除和查询模块）在执行该子命令时才导入，
+# 查看帮助、参数错误和查看报告时不导入，供 cron 和 CI 频繁调用时快速启动
+
+# 开始执行本模块的时间，--timing 时输出启动和执行耗时
+STARTED = time.perf_counter()
+
+# 以下默认值与 main.PLAN_FILE、filters.FILTER_FILE、recorder.RECORD_FILE、metrics.REPORT_FILE、
+# ugn_clean.REPORT_FILE 和 ugn_clean.UGN_WORKERS 相同，在这里重复定义是为了生成帮助信息时不必导入这些模块
+PLAN_FILE = 'sweep_plan.json'
+FILTER_FILE = 'sweep_filter.json'
+RECORD_FILE = 'recording.jsonl.gz'
+REPORT_FILE = 'sweep_report.json'
+UGN_REPORT_FILE = 'ugn_report.json'
+UGN_WORKERS = 16
+
+# 输出启动和执行耗时，主命令和各子命令都支持（main.py 和 ugn_clean.py 只传入子命令的参数）；
+# 子命令中未指定时不覆盖主命令的设置
+def add_timing_argument(parser, default=False):
+    parser.add_argument('--timing', action='store_true', default=default,
+                        help='结束时输出启动耗时（导入模块、解析参数）和执行耗时')
+
+# 录制和运行报告相关的参数，各子命令共用
+def add_output_arguments(parser, report_file):
+    parser.add_argument('--record', nargs='?', const=RECORD_FILE, metavar='FILE',
+                        help='把每个请求的参数、响应和耗时录制到压缩的JSONL文件（默认 %(const)s），可用 recorder.py 回放')
+    parser.add_argument('--report', default=report_file, help='运行报告（JSON）的输出文件，默认 %(default)s')
+    parser.add_argument('--prometheus', help='同时以Prometheus textfile格式写入指标的文件')
+
+# sweep 和 plan 子命令共用的参数
+def add_scope_arguments(parser):
+    parser.add_argument('--project', help='项目ID，默认为 main.py 中的 ProjectId')
+    parser.add_argument('--vpc', nargs='+', metavar='VPCID',
+                        help='只处理指定的VPC及依赖它的子网、虚拟网卡、NATGW、ALB、UHost（含挂载的UDisk和EIP），并解绑UGN')
+    parser.add_argument('--filter', metavar='FILE',
+                        help=f'资源过滤规则（JSON），只处理匹配的资源，默认读取 {FILTER_FILE}（不存在时处理全部资源）')
+
+# 删除资源；--plan 时只生成删除计划
+def run_sweep(args):
+    if args.plan and args.apply:
+        args.parser.error('--plan 与 --apply 不能同时使用')
+    if args.vpc and args.apply:
+        args.parser.error('--vpc 与 --apply 不能同时使用')
+    import main
+    from filters import configure_filter, load_filter
+    from metrics import METRICS
+    from recorder import start_recording, stop_recording
+    project_id = args.project or main.ProjectId
+    rules = load_filter(args.filter)
+    if rules is None:
+        return 1
+    configure_filter(rules)
+    plan = None
+    if args.apply:
+        from plan import load_plan
+        plan = load_plan(args.apply, project_id)
+        if plan is None:
+            return 1
+    if args.record:
+        start_recording(args.record)
+    try:
+        if args.vpc:
+            # 先查询出依赖这些VPC的资源，生成只包含这些资源的计划
+            from vpc_teardown import build_vpc_plan
+            plan = build_vpc_plan(project_id, args.vpc)
+            if plan is None:
+                return 1
+        if args.plan:
+            from plan import run_plan, write_plan
+            plan = run_plan(project_id, args.plan) if plan is None else write_plan(plan, args.plan)
+            # 地域配置缺失或有资源类型查询失败时计划不完整，以失败退出
+            if plan is None or any(plan['errors'].values()):
+                return 1
+        else:
+            if plan is not None and plan.get('ugn_networks'):
+                from vpc_teardown import detach_planned_ugns
+                detach_planned_ugns(project_id, plan)
+            if args.use_async:
+                from async_sweep import run_sweep as run_sweep_async
+                results = run_sweep_async(project_id, resume=args.resume, refresh=args.refresh, plan=plan,
+                                          verify=args.verify, requeue=args.requeue)
+            else:
+                results = main.main(project_id, resume=args.resume, refresh=args.refresh, plan=plan,
+                                    verify=args.verify, requeue=args.requeue)
+            # 地域配置缺失、有资源查询或删除失败、校验发现残留资源时以失败退出，便于 cron 和 CI 发现
+            if results is None or any(result['errors'] or result.get('leaked') for result in results.values()):
+                return 1
+    finally:
+        stop_recording()
+        METRICS.save(args.report, args.prometheus)
+    return 0
+
+# 解绑 UGN 与 VPC 并删除 UGN
+def run_ugn(args):
+    import ugn_clean
+    from metrics import METRICS
+    from recorder import start_recording, stop_recording
+    if args.all_regions:
+        targets = ugn_clean.load_targets()
+        if targets is None:
+            return 1
+    elif args.region and args.zone:
+        targets = [(args.region, args.zone)]
+    else:
+        args.parser.print_usage()
+        return 1
+
+    if args.record:
+        start_recording(args.record)
+    try:
+        if args.use_async:
+            from async_sweep import run_ugn_clean
+            run_ugn_clean(args.project_id, targets)
+        else:
+            ugn_clean.main(args.project_id, targets, args.workers)
+    finally:
+        stop_recording()
+        METRICS.save(args.report, args.prometheus)
+    return 0
+
+# 输出已保存的运行报告，不访问API
+def run_report(args):
+    from metrics import load_report, print_report
+    status = 0
+    for path in args.paths:
+        report = load_report(path)
+        if report is None:
+            status = 1
+            continue
+        if len(args.paths) > 1:
+            print(f"{path}:")
+        print_report(report)
+    return status
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='拨测任务资源清理工具')
+    add_timing_argument(parser)
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+    subparsers.required = True
+
+    sweep = subparsers.add_parser('sweep', help='删除UHost、UDisk、EIP、ALB、NATGW、子网、VPC等资源',
+                                  description='删除拨测任务产生的UHost、UDisk、EIP、ALB、NATGW、子网、VPC等资源')
+    sweep.add_argument('--resume', action='store_true', help='从断点日志继续，跳过上次运行中已完成的资源')
+    sweep.add_argument('--refresh', action='store_true', help='忽略空资源类型缓存，重新查询所有地域的全部资源')
+    sweep.add_argument('--async', dest='use_async', action='store_true', help='使用异步客户端在单个事件循环中执行（需安装 aiohttp）')
+    sweep.add_argument('--plan', nargs='?', const=PLAN_FILE, metavar='FILE',
+                       help='只查询资源并生成删除计划（默认写入 %(const)s），不删除任何资源')
+    sweep.add_argument('--apply', metavar='FILE', help='按 --plan 生成的删除计划执行删除，不再重新查询资源列表')
+    sweep.add_argument('--verify', action='store_true',
+                       help='删除完成后并发重新查询所有资源，输出仍然存在的资源及其删除失败的原因，存在残留时以退出码1结束')
+    sweep.add_argument('--requeue', action='store_true', help='校验发现残留资源时立即只针对这些资源重新删除一轮（包含 --verify）')
+    add_scope_arguments(sweep)
+    add_output_arguments(sweep, REPORT_FILE)
+    add_timing_argument(sweep, argparse.SUPPRESS)
+    sweep.set_defaults(func=run_sweep, parser=sweep)
+
+    ugn = subparsers.add_parser('ugn', help='解绑 UGN 与 VPC 并删除 UGN', description='解绑 UGN 与 VPC 并删除 UGN',
+                                usage='%(prog)s <ProjectId> <Region> <Zone> [--async]\n'
+                                      '       %(prog)s <ProjectId> --all-regions [--async]',
+                                epilog='Example: %(prog)s org-xxxxx cn-bj2 cn-bj2-01')
+    ugn.add_argument('project_id')
+    ugn.add_argument('region', nargs='?')
+    ugn.add_argument('zone', nargs='?')
+    ugn.add_argument('--all-regions', action='store_true', help='清理 region.json 中所有地域的 UGN')
+    ugn.add_argument('--workers', type=int, default=UGN_WORKERS, help='同时处理的 UGN 数量')
+    ugn.add_argument('--async', dest='use_async', action='store_true', help='使用异步客户端（需安装 aiohttp）')
+    add_output_arguments(ugn, UGN_REPORT_FILE)
+    add_timing_argument(ugn, argparse.SUPPRESS)
+    ugn.set_defaults(func=run_ugn, parser=ugn)
+
+    plan = subparsers.add_parser('plan', help='只查询资源并生成删除计划，不删除任何资源',
+                                 description='查询资源并生成删除计划，确认后可用 sweep --apply 执行')
+    plan.add_argument('plan', nargs='?', default=PLAN_FILE, metavar='FILE', help='删除计划的输出文件，默认 %(default)s')
+    add_scope_arguments(plan)
+    add_output_arguments(plan, REPORT_FILE)
+    add_timing_argument(plan, argparse.SUPPRESS)
+    plan.set_defaults(func=run_sweep, parser=plan, apply=None, resume=False, refresh=False, use_async=False,
+                      verify=False, requeue=False)
+
+    report = subparsers.add_parser('report', help='查看 sweep、ugn 保存的运行报告',
+                                   description='按网络耗时从高到低输出运行报告中各接口的统计')
+    report.add_argument('paths', nargs='*', default=[REPORT_FILE], metavar='FILE', help='运行报告文件，默认 %(default)s')
+    add_timing_argument(report, argparse.SUPPRESS)
+    report.set_defaults(func=run_report, parser=report)
+    return parser
+
+# 解析参数并执行子命令，返回退出码
+def run(argv=None):
+    args = build_parser().parse_args(argv)
+    dispatched = time.perf_counter()
+    try:
+        return args.func(args)
+    finally:
+        if args.timing:
+            finished = time.perf_counter()
+            print(f"启动耗时 {(dispatched - STARTED) * 1000:.1f}ms，执行耗时 {finished - dispatched:.3f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    sys.exit(run())
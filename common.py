@@ -1,5 +1,28 @@
 import requests
-import json
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
+from urllib.parse import parse_qsl, urlparse
+from requests.adapters import HTTPAdapter
+from ratelimit import RateLimiter, is_throttled
+from endpoints import EndpointRouter, load_endpoints
+from metrics import METRICS
+from recorder import get_recorder
+from retry_policy import (OK, RETRYABLE, GONE, CONNECT_TIMEOUT, READ_TIMEOUT, RETRY_INTERVAL, RETRY_MAX_INTERVAL,
+                          ApiError, classify, should_retry, describe_failure)
+
+# UCloud API 地址，可通过环境变量 UCLOUD_API_URL 指向本地模拟服务（见 mock_server.py）
+API_URL = os.environ.get('UCLOUD_API_URL', 'https://api.ucloud.cn/')
+# 分页查询时删除正在生效、一轮查询不完整时重新查询的间隔，以及等待列表稳定的最长时间（秒），见 list_resources
+LIST_RETRY_INTERVAL = 0.5
+LIST_SETTLE_TIMEOUT = 60
+
+# 日志缓冲，并发执行时每个任务的输出单独收集；线程和asyncio协程任务各自拥有独立的上下文
+_log_buffer = contextvars.ContextVar('log_buffer', default=None)
 
 # 读取cookie和token信息
 def read_headers_and_token():
@@ -9,28 +32,353 @@ def read_headers_and_token():
         token = f.read().strip()
     return headers, token
 
+# 长连接HTTP客户端：复用同一个Session的连接池，避免每次请求重新建立TCP+TLS连接，
+# 并缓存cookie和token，避免每次请求重复读取文件
+class ApiClient:
+    def __init__(self, pool_size=32, timeout=None, limiter=None, router=None):
+        # 分别设置连接超时和读取超时，连接失败时尽快重试
+        self.timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+        # 所有请求都经过限流器，按全局、接口、地域限速并自适应调整并发
+        self.limiter = limiter or RateLimiter()
+        self.session = requests.Session()
+        # 连接池按主机划分，每个接入点各自保持pool_size个长连接
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # 按地域选择延迟最低的可用接入点，见 endpoints.py；传入router时沿用其探测结果和各接入点的状态
+        if router is None:
+            router = EndpointRouter(API_URL, *load_endpoints(API_URL))
+        router.session = self.session
+        self.router = router
+        METRICS.add_section('endpoints', router.report if len(router.endpoints) > 1 else None)
+        self._headers = None
+        self._lock = threading.Lock()
+
+    # 获取通用HTTP头，首次调用时读取文件
+    def headers(self):
+        if self._headers is None:
+            with self._lock:
+                if self._headers is None:
+                    headers, token = read_headers_and_token()
+                    self._headers = {
+                        'Cookie': headers,
+                        'U-CSRF-Token': token
+                    }
+        return self._headers
+
+    # 发送POST请求，未指定headers时使用通用HTTP头；连接失败时立即改用该地域的其他可用接入点
+    def post(self, url, headers=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        action, region = request_target(url, kwargs.get('data'), kwargs.get('json'))
+        recorder = get_recorder()
+        with self.limiter.limit(action, region) as report:
+            tried = set()
+            while True:
+                endpoint, target = self.router.route(url, region, tried)
+                # 只统计网络请求本身的耗时，不含限流等待
+                started = time.monotonic()
+                try:
+                    response = self.session.post(target, headers=headers or self.headers(), **kwargs)
+                    break
+                except Exception as e:
+                    METRICS.record_request(action, time.monotonic() - started, error=True)
+                    if recorder is not None:
+                        recorder.record(request_params(url, kwargs.get('data'), kwargs.get('json')), None, None,
+                                        time.monotonic() - started, str(e) or type(e).__name__)
+                    # 只有连接失败（含建立连接超时）才停用接入点，读取超时等其他错误由调用方重试
+                    if endpoint is None or not isinstance(e, requests.ConnectionError):
+                        raise
+                    self.endpoint_failed(endpoint, e)
+                    tried.add(endpoint)
+                    if not self.router.has_alternative(region, tried):
+                        raise
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            seconds = time.monotonic() - started
+            if response.status_code >= 500:
+                self.endpoint_failed(endpoint, f"HTTP {response.status_code}")
+            else:
+                self.router.succeeded(endpoint, region, seconds)
+            failed = not response.ok or not isinstance(body, dict) or body.get('RetCode', 0) != 0
+            METRICS.record_request(action, seconds, body_size(response.request.body), len(response.content), failed)
+            if recorder is not None:
+                recorder.record(request_params(url, kwargs.get('data'), kwargs.get('json')), response.status_code,
+                                response.text if body is None else body, seconds)
+            report(is_throttled(response.status_code, body))
+        return response
+
+    # 停用失败的接入点
+    def endpoint_failed(self, endpoint, error):
+        cooldown = self.router.failed(endpoint)
+        if cooldown:
+            log(f"接入点 {endpoint} 请求失败（{error}），{cooldown}秒内改用其他接入点")
+
+# 计算请求体的字节数
+def body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    return len(body)
+
+# 拼接接口的请求地址
+def api_url(action):
+    return f"{API_URL}?Action={action}"
+
+# 合并请求URL、表单和JSON中的参数
+def request_params(url, data=None, json_body=None):
+    params = dict(parse_qsl(urlparse(url).query))
+    if isinstance(data, str):
+        params.update(parse_qsl(data))
+    elif isinstance(data, dict):
+        params.update(data)
+    if isinstance(json_body, dict):
+        params.update(json_body)
+    return params
+
+# 从请求URL和参数中解析接口名称和地域，用于限流
+def request_target(url, data=None, json_body=None):
+    params = request_params(url, data, json_body)
+    return params.get('Action'), params.get('Region')
+
+_client = None
+_client_lock = threading.Lock()
+
+# 获取全局共享的客户端
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ApiClient()
+    return _client
+
+# 按指定连接池大小和限流器重新创建全局共享的客户端；API地址未变时沿用原客户端的接入点路由，不重新探测
+def configure_client(pool_size=32, timeout=None, limiter=None):
+    global _client
+    with _client_lock:
+        router = _client.router if _client is not None and _client.router.base == API_URL else None
+        _client = ApiClient(pool_size, timeout, limiter, router)
+    return _client
+
 # 定义通用的HTTP头信息
 def get_common_headers():
-    headers, token = read_headers_and_token()
-    common_headers = {
-        'Cookie': headers,
-        'U-CSRF-Token': token
-    }
-    return common_headers
-
-# 执行POST请求
-def post_request(url, data, headers):
+    return dict(get_client().headers())
+
+# 发送一次POST请求，返回(响应内容, 结果分类, 错误信息)；HTTP状态码表示失败时响应内容为None
+def post_once(url, data=None, headers=None, json_body=None):
     try:
-        response = requests.post(url, data=data, headers=headers, timeout=60)
-        response.raise_for_status()
+        response = get_client().post(url, data=data, headers=headers, json=json_body)
     except requests.exceptions.Timeout:
-        print("请求超时，请检查网络连接或服务器状态。")
-        return None
+        return None, RETRYABLE, "请求超时，请检查网络连接或服务器状态。"
     except requests.RequestException as e:
-        print(f"请求失败: {e}")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"JSON解析失败: {e}")
-        return None
+        return None, RETRYABLE, f"请求失败: {e}"
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    category = classify(response.status_code, body)
+    if response.status_code >= 400:
+        return None, category, f"请求失败: HTTP {response.status_code}"
+    if body is None:
+        return None, category, f"JSON解析失败: {response.text[:200]}"
+    return body, category, describe_failure(body)
+
+# 执行POST请求并返回JSON响应：限流、服务端错误、网络异常按指数退避重试，依赖资源尚未就绪时在
+# DEPENDENCY_TIMEOUT内持续重试；返回最后一次的响应内容（可能带有非0的RetCode），请求失败时返回None
+def post_request(url, data=None, headers=None, json_body=None):
+    action, _ = request_target(url, data, json_body)
+    delays = backoff_delays(RETRY_INTERVAL, RETRY_MAX_INTERVAL)
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        body, category, error = post_once(url, data, headers, json_body)
+        if not should_retry(category, attempt, time.monotonic() - started):
+            if category not in (OK, GONE):
+                log(f"{action} 失败（第{attempt}次请求）: {error}")
+            return body
+        delay = next(delays)
+        METRICS.record_retry(action)
+        METRICS.record_sleep('retry', delay)
+        time.sleep(delay)
+
+# 构造分页查询函数：在原查询参数的基础上替换Offset和Limit后调用post_request
+def page_fetcher(url, data, headers):
+    def fetch_page(offset, limit):
+        query = dict(data, Offset=offset, Limit=limit, _timestamp=int(time.time() * 1000))
+        return post_request(url, query, headers)
+    return fetch_page
+
+# 获取全部分页：先获取第一页，再根据TotalCount并发获取剩余各页，按完成顺序逐页返回(该页资源, 第一页的TotalCount)；
+# 响应中没有TotalCount时逐页获取，直到某一页不满。任一页查询失败时抛出ApiError，避免被当作没有资源
+def iter_pages(fetch_page, set_key, limit, max_workers=4):
+    first = fetch_page(0, limit)
+    if first is None or set_key not in first:
+        raise ApiError(f"查询失败: {describe_failure(first)}")
+    page = first[set_key] or []
+    total = first.get('TotalCount')
+    yield page, total
+
+    if total is None:
+        offset = limit
+        while len(page) >= limit:
+            response = fetch_page(offset, limit)
+            if response is None or set_key not in response:
+                raise ApiError(f"查询失败: {describe_failure(response)}")
+            page = response[set_key] or []
+            yield page, total
+            offset += limit
+        return
+
+    # 服务端每页返回的数量上限小于limit时，按实际每页数量计算其余分页的偏移量
+    if 0 < len(page) < min(limit, total):
+        limit = len(page)
+    offsets = range(limit, total, limit)
+    if not offsets:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as executor:
+        futures = [executor.submit(fetch_page, offset, limit) for offset in offsets]
+        for future in as_completed(futures):
+            response = future.result()
+            if response is None or set_key not in response:
+                raise ApiError(f"查询失败: {describe_failure(response)}")
+            yield response[set_key] or [], total
+
+# 一轮查询结束后判断是否已看到全部资源：listed为本轮查询到的资源ID，total为本轮第一页的TotalCount。
+# 资源只会减少，本轮查询到的资源都在第一页返回时存在，数量达到total即为全部；
+# 没有TotalCount时只能以一页即返回全部或本轮没有新资源为准
+def listing_complete(listed, total, pages, found):
+    if total is None:
+        return pages <= 1 or found == 0
+    return len(listed) >= total
+
+# 分页查询资源，逐个返回（按id_key去重，id_key也可以是从每项中取出ID的函数，如 records.record_id）；
+# 数据多于一页时，调用方在迭代过程中删除资源会使分页的偏移量发生变化，未查询到的资源可能移入本轮已查询过的分页，
+# 因此重新查询直到某一轮查询到的资源数量达到TotalCount；删除尚未生效、没有新资源时间隔LIST_RETRY_INTERVAL再查询，
+# 超过LIST_SETTLE_TIMEOUT仍未查询完整时抛出ApiError，避免遗漏的资源被当作已处理
+def list_resources(fetch_page, set_key, id_key, limit, max_workers=4):
+    key = id_key if callable(id_key) else itemgetter(id_key)
+    seen = set()
+    deadline = None
+    while True:
+        listed = set()
+        found = 0
+        pages = 0
+        total = None
+        for page, total in iter_pages(fetch_page, set_key, limit, max_workers):
+            pages += 1
+            for item in page:
+                resource_id = key(item)
+                listed.add(resource_id)
+                if resource_id not in seen:
+                    seen.add(resource_id)
+                    found += 1
+                    yield item
+        if listing_complete(listed, total, pages, found):
+            return
+        if found:
+            deadline = None
+            continue
+        if deadline is None:
+            deadline = time.monotonic() + LIST_SETTLE_TIMEOUT
+        elif time.monotonic() > deadline:
+            raise ApiError(f"查询失败: 资源列表持续变化，{LIST_SETTLE_TIMEOUT}秒内未能查询完整（共{total}个，查询到{len(listed)}个）")
+        METRICS.record_sleep('poll', LIST_RETRY_INTERVAL)
+        time.sleep(LIST_RETRY_INTERVAL)
+
+# 支持在一次请求中携带多个资源ID的接口，及其数组参数的格式
+ARRAY_PARAMS = {
+    'DescribeUHostInstance': 'UHostIds.{}',
+    'DescribeVPC': 'VPCIds.{}',
+    'DescribeSubnet': 'SubnetIds.{}',
+    'DescribeNATGW': 'NATGWIds.{}',
+    'DescribeNetworkInterface': 'InterfaceId.{}',
+    'DetachUGNNetworks': 'Networks[{}]',
+}
+# 每个批量请求携带的资源ID数量
+BATCH_SIZE = 50
+
+# 判断接口是否支持批量传入资源ID
+def supports_batch(action):
+    return action in ARRAY_PARAMS
+
+# 批量调用：接口支持数组参数时，按batch_size将ids分组，每组合并为一个请求；
+# 否则逐个调用，单个ID通过id_param传入。call(params)发送请求并返回响应，
+# 逐组返回(该组ids, 响应)
+def batch_call(call, data, id_param, ids, batch_size=BATCH_SIZE):
+    ids = list(ids)
+    template = ARRAY_PARAMS.get(data['Action'])
+    if template is None:
+        for resource_id in ids:
+            yield [resource_id], call(dict(data, **{id_param: resource_id}))
+        return
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        params = dict(data)
+        for i, resource_id in enumerate(chunk):
+            params[template.format(i)] = resource_id
+        yield chunk, call(params)
+
+# 批量执行操作并返回每个资源的结果{id: 是否成功}；批量请求失败时逐个重试，以区分具体失败的资源
+def batch_execute(call, data, id_param, ids, batch_size=BATCH_SIZE):
+    results = {}
+    for chunk, response in batch_call(call, data, id_param, ids, batch_size):
+        ok = response is not None and response.get('RetCode', 0) == 0
+        if ok or len(chunk) == 1:
+            results.update((resource_id, ok) for resource_id in chunk)
+            continue
+        for resource_id in chunk:
+            METRICS.record_retry(data.get('Action'))
+            single = call(dict(data, **{id_param: resource_id}))
+            results[resource_id] = single is not None and single.get('RetCode', 0) == 0
+    return results
+
+# 开启当前上下文的日志缓冲
+def start_log_buffer():
+    _log_buffer.set([])
+
+# 关闭当前上下文的日志缓冲，并返回已收集的日志行
+def stop_log_buffer():
+    lines = _log_buffer.get() or []
+    _log_buffer.set(None)
+    return lines
+
+# 获取当前上下文的日志缓冲，便于子线程写入同一缓冲
+def get_log_buffer():
+    return _log_buffer.get()
+
+# 设置当前上下文的日志缓冲
+def set_log_buffer(buffer):
+    _log_buffer.set(buffer)
+
+# 输出日志：开启缓冲时写入缓冲，否则直接打印
+def log(*args):
+    buffer = _log_buffer.get()
+    if buffer is None:
+        print(*args)
     else:
-        return response.json()
\ No newline at end of file
+        buffer.append(' '.join(str(arg) for arg in args))
+
+# 生成带随机抖动的指数退避间隔（秒）
+def backoff_delays(interval=0.5, max_interval=10, factor=2):
+    delay = interval
+    while True:
+        yield random.uniform(delay / 2, delay)
+        delay = min(delay * factor, max_interval)
+
+# 轮询等待：反复调用check直到其返回真值，两次调用之间按指数退避等待，
+# 超过timeout秒仍未满足时返回False
+def wait_until(check, timeout=300, interval=0.5, max_interval=10):
+    deadline = time.monotonic() + timeout
+    for delay in backoff_delays(interval, max_interval):
+        if check():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        delay = min(delay, remaining)
+        METRICS.record_sleep('poll', delay)
+        time.sleep(delay)
@@ -0,0 +1,184 @@
+import argparse
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from retry_policy import CONNECT_TIMEOUT
+
+# 按地域选择API接入点：首次请求前并发探测各接入点的往返延迟（探测请求建立的连接留在连接池中），
+# 之后按各地域实际请求耗时的滑动平均选择延迟最低的可用接入点；请求失败的接入点暂时停用，
+# 请求转到其他接入点，停用时间随连续失败次数加倍。只配置了一个接入点时不探测，请求直接发往该接入点
+
+# 接入点配置文件，不存在时只使用 common.API_URL
+ENDPOINTS_FILE = 'endpoints.json'
+# 每个接入点的探测次数，取最小值作为往返延迟
+PROBE_SAMPLES = 2
+# 实际请求耗时滑动平均的平滑系数
+LATENCY_ALPHA = 0.2
+# 每个地域每发送这么多个请求，把其中一个发往次优的接入点，以更新其他接入点在该地域的耗时
+EXPLORE_EVERY = 50
+# 接入点失败后停用的初始时间和最长时间（秒）
+COOLDOWN = 5
+MAX_COOLDOWN = 120
+
+# 规范化接入点地址，以/结尾
+def normalize_endpoint(url):
+    return url if url.endswith('/') else url + '/'
+
+# 读取接入点配置：{"endpoints": [接入点地址], "regions": {地域: [该地域可用的接入点地址]}}，
+# 未在regions中列出的地域可使用全部接入点；文件不存在时只使用default，格式错误时输出警告并只使用default
+def load_endpoints(default, path=ENDPOINTS_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        endpoints = [normalize_endpoint(url) for url in config.get('endpoints') or [default]]
+        regions = {region: [normalize_endpoint(url) for url in urls] for region, urls in (config.get('regions') or {}).items()}
+    except FileNotFoundError:
+        return [default], {}
+    except (json.JSONDecodeError, AttributeError, TypeError) as e:
+        print(f"警告: 接入点配置 {path} 无效，只使用 {default}: {e}")
+        return [default], {}
+    # 只在regions中列出的接入点也参与探测
+    for urls in regions.values():
+        endpoints.extend(url for url in urls if url not in endpoints)
+    return endpoints, regions
+
+# 接入点路由：base为 api_url 生成的请求地址前缀，发送前替换为选中的接入点；
+# session为发送探测请求的 requests.Session，与正式请求共用连接池
+class EndpointRouter:
+    def __init__(self, base, endpoints, regions=None, session=None):
+        self.base = base
+        self.endpoints = endpoints
+        self.regions = regions or {}
+        self.session = session
+        self.lock = threading.Lock()
+        self.probe_lock = threading.Lock()
+        self.probed = len(endpoints) <= 1
+        self.rtt = {}
+        self.latency = {}
+        self.failures = {}
+        self.down_until = {}
+        self.counts = {}
+
+    # 并发探测各接入点：每个接入点发送PROBE_SAMPLES次HEAD请求，收到任何HTTP响应即视为可用
+    def probe(self):
+        def measure(endpoint):
+            best = math.inf
+            for _ in range(PROBE_SAMPLES):
+                started = time.monotonic()
+                try:
+                    self.session.head(endpoint, timeout=CONNECT_TIMEOUT)
+                except Exception as e:
+                    return endpoint, None, type(e).__name__
+                best = min(best, time.monotonic() - started)
+            return endpoint, best, None
+
+        with ThreadPoolExecutor(max_workers=len(self.endpoints)) as executor:
+            results = list(executor.map(measure, self.endpoints))
+        for endpoint, rtt, error in results:
+            if error is None:
+                self.rtt[endpoint] = rtt
+            else:
+                self.failed(endpoint)
+        print("接入点延迟: " + '，'.join(
+            f"{endpoint} {rtt * 1000:.1f}ms" if error is None else f"{endpoint} 不可用（{error}）"
+            for endpoint, rtt, error in results))
+        return results
+
+    # 首次选择接入点时探测一次
+    def ensure_probed(self):
+        if self.probed:
+            return
+        with self.probe_lock:
+            if not self.probed:
+                self.probe()
+                self.probed = True
+
+    # 接入点在地域的预估耗时：有实际请求耗时时取滑动平均，否则取探测的往返延迟
+    def estimate(self, endpoint, region):
+        return self.latency.get((endpoint, region), self.rtt.get(endpoint, math.inf))
+
+    def available(self, endpoint, now):
+        return self.down_until.get(endpoint, 0) <= now
+
+    # 选择地域的接入点；exclude为本次请求已经失败的接入点，全部失败或停用时选择最早恢复的接入点
+    def choose(self, region, exclude=()):
+        self.ensure_probed()
+        candidates = self.regions.get(region, self.endpoints)
+        now = time.monotonic()
+        with self.lock:
+            ranked = sorted((endpoint for endpoint in candidates if endpoint not in exclude and self.available(endpoint, now)),
+                            key=lambda endpoint: self.estimate(endpoint, region))
+            if not ranked:
+                return min(candidates, key=lambda endpoint: self.down_until.get(endpoint, 0))
+            count = self.counts[region] = self.counts.get(region, 0) + 1
+            if len(ranked) > 1 and count % EXPLORE_EVERY == 0:
+                return ranked[1]
+            return ranked[0]
+
+    # 返回(接入点, 请求地址)；不是 api_url 生成的地址时原样返回，接入点为None
+    def route(self, url, region, exclude=()):
+        if not url.startswith(self.base):
+            return None, url
+        endpoint = self.endpoints[0] if len(self.endpoints) == 1 else self.choose(region, exclude)
+        return endpoint, endpoint + url[len(self.base):]
+
+    # 除exclude外是否还有可用的接入点
+    def has_alternative(self, region, exclude):
+        now = time.monotonic()
+        with self.lock:
+            return any(endpoint not in exclude and self.available(endpoint, now)
+                       for endpoint in self.regions.get(region, self.endpoints))
+
+    # 请求成功：更新接入点在该地域的耗时，清除失败记录
+    def succeeded(self, endpoint, region, seconds):
+        if endpoint is None or len(self.endpoints) <= 1:
+            return
+        with self.lock:
+            key = (endpoint, region)
+            previous = self.latency.get(key)
+            self.latency[key] = seconds if previous is None else previous + LATENCY_ALPHA * (seconds - previous)
+            self.failures.pop(endpoint, None)
+            self.down_until.pop(endpoint, None)
+
+    # 请求失败（连接失败、超时或服务端错误）：停用接入点，返回停用的秒数
+    def failed(self, endpoint):
+        if endpoint is None or len(self.endpoints) <= 1:
+            return 0
+        with self.lock:
+            failures = self.failures[endpoint] = self.failures.get(endpoint, 0) + 1
+            cooldown = min(COOLDOWN * 2 ** (failures - 1), MAX_COOLDOWN)
+            self.down_until[endpoint] = time.monotonic() + cooldown
+        return cooldown
+
+    # 各接入点的探测延迟、各地域的平均耗时和是否停用
+    def report(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                endpoint: {
+                    'rtt': round(self.rtt[endpoint], 4) if endpoint in self.rtt else None,
+                    'latency': {region: round(seconds, 4) for (name, region), seconds in sorted(self.latency.items(), key=str)
+                                if name == endpoint},
+                    'failures': self.failures.get(endpoint, 0),
+                    'down': not self.available(endpoint, now),
+                }
+                for endpoint in self.endpoints
+            }
+
+if __name__ == '__main__':
+    import common
+    from main import load_regions
+    parser = argparse.ArgumentParser(description='探测 endpoints.json 中各接入点的延迟，并输出 region.json 中各地域选择的接入点')
+    parser.parse_args()
+    router = common.get_client().router
+    if len(router.endpoints) <= 1:
+        print(f"只配置了一个接入点: {router.endpoints[0]}")
+        raise SystemExit(0)
+    router.ensure_probed()
+    regions_data = load_regions()
+    if regions_data is None:
+        raise SystemExit(1)
+    for info in regions_data.values():
+        print(f"{info['Region']}: {router.choose(info['Region'])}")
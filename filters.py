@@ -0,0 +1,196 @@
+import bisect
+import hashlib
+import json
+import time
+from records import ResourceStore
+
+# 资源过滤规则的默认配置文件，不存在时不过滤，删除查询到的全部资源
+FILTER_FILE = 'sweep_filter.json'
+# 支持的过滤条件：资源ID、标签（业务组）、名称前缀、所属VPC、创建时间距今的最小和最大小时数
+CRITERIA = ('ids', 'tags', 'name_prefixes', 'vpc_ids', 'min_age_hours', 'max_age_hours')
+
+# 资源所属的VPC：没有VPC字段的资源（UDisk、EIP）按其挂载或绑定的资源所属的VPC，owners为 {资源ID: VPC}
+def record_vpc(record, owners):
+    if record.vpc is not None:
+        return record.vpc
+    return owners.get(record.parent) if record.parent is not None else None
+
+# 资源挂载或绑定在其他资源上，但该资源所属的VPC未知（本次未查询该资源类型，如断点续跑或按缓存跳过）
+def unknown_vpc(record, owners):
+    return record.vpc is None and record.parent is not None and record.parent not in owners
+
+# 判断单个资源记录是否满足一个过滤条件；资源没有该条件对应的字段时不满足
+def check(key, value, record, now, owners):
+    if key == 'ids':
+        return record.id in value
+    if key == 'tags':
+        return record.tag is not None and record.tag in value
+    if key == 'name_prefixes':
+        return record.name is not None and record.name.startswith(value)
+    if key == 'vpc_ids':
+        return record_vpc(record, owners) in value
+    if record.created is None:
+        return False
+    age = (now - record.created) / 3600
+    return age >= value if key == 'min_age_hours' else age <= value
+
+# 规范化一组过滤条件：列表转为集合（名称前缀转为元组），小时数转为浮点数，空条件忽略
+def normalize(criteria, section):
+    unknown = set(criteria) - set(CRITERIA)
+    if unknown:
+        raise ValueError(f"{section} 中存在不支持的过滤条件: {', '.join(sorted(unknown))}")
+    result = {}
+    for key, value in criteria.items():
+        if value is None or value == []:
+            continue
+        if key in ('min_age_hours', 'max_age_hours'):
+            result[key] = float(value)
+        elif key == 'name_prefixes':
+            result[key] = tuple(value)
+        else:
+            result[key] = set(value)
+    return result
+
+# 过滤规则：资源需满足include中的全部条件（同一条件内满足任意一个值即可），且不满足exclude中的任何条件；
+# 资源没有某个条件对应的字段时（如没有标签）不满足该条件，include中的条件因此只选中确认满足的资源。
+# 按VPC过滤时，owners记录已查询到的资源所属的VPC，UDisk、EIP按挂载或绑定的资源判断；
+# exclude中指定了VPC时，挂载或绑定的资源所属VPC未知的UDisk、EIP同样不删除
+class FilterRules:
+    def __init__(self, include=None, exclude=None):
+        self.include = normalize(include or {}, 'include')
+        self.exclude = normalize(exclude or {}, 'exclude')
+        self.owners = {}
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    # 记录资源所属的VPC，之后查询到的挂载或绑定在其上的资源据此判断是否属于指定的VPC；
+    # 须在查询依赖它的资源类型之前记录（UHost、ALB、NATGW先于UDisk、EIP查询）
+    def remember(self, record):
+        if record.vpc is not None and ('vpc_ids' in self.include or 'vpc_ids' in self.exclude):
+            self.owners[record.id] = record.vpc
+
+    # 判断单个资源记录是否被选中，用于边查询边删除的场景
+    def matches(self, record, now=None):
+        now = time.time() if now is None else now
+        if not all(check(key, value, record, now, self.owners) for key, value in self.include.items()):
+            return False
+        if 'vpc_ids' in self.exclude and unknown_vpc(record, self.owners):
+            return False
+        return not any(check(key, value, record, now, self.owners) for key, value in self.exclude.items())
+
+    # 可以直接作为查询参数的条件：接口支持按该字段过滤且include中只指定了一个值时，由服务端过滤以减小响应
+    def query_params(self, spec):
+        params = {}
+        for key, param in spec.get('filter_params', {}).items():
+            values = self.include.get(key)
+            if values is not None and len(values) == 1:
+                params[param] = next(iter(values))
+        return params
+
+    # 规则的摘要，用于区分不同规则下缓存的资源数量
+    def fingerprint(self):
+        if not self:
+            return ''
+        rules = {section: {key: sorted(value) if isinstance(value, (set, tuple)) else value for key, value in criteria.items()}
+                 for section, criteria in (('include', self.include), ('exclude', self.exclude))}
+        return hashlib.sha1(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:12]
+
+# 在资源记录集合的基础上按标签、名称前缀和创建时间建立的索引，一次选出满足过滤规则的全部资源ID
+class ResourceIndex(ResourceStore):
+    def __init__(self):
+        super().__init__()
+        self.by_tag = {}
+        self.names = []
+        self.created = []
+        self.dirty = False
+
+    # 按查询结果中的顺序排列的资源ID
+    @property
+    def ids(self):
+        return list(self.records)
+
+    def add(self, record):
+        super().add(record)
+        resource_id = record.id
+        if record.tag is not None:
+            self.by_tag.setdefault(record.tag, set()).add(resource_id)
+        if record.name is not None:
+            self.names.append((record.name, resource_id))
+        if record.created is not None:
+            self.created.append((record.created, resource_id))
+        self.dirty = True
+
+    # 名称和创建时间在首次查找时排序，之后按二分查找范围
+    def _sort(self):
+        if self.dirty:
+            self.names.sort()
+            self.created.sort()
+            self.dirty = False
+
+    # 满足一个过滤条件的资源ID；owners为已查询到的资源所属的VPC，见 FilterRules.remember
+    def lookup(self, key, value, now, owners):
+        if key == 'ids':
+            return value & self.records.keys()
+        if key == 'tags':
+            return set().union(*(self.by_tag.get(tag, ()) for tag in value))
+        if key == 'vpc_ids':
+            attached = self.attached_to([owner for owner, vpc in owners.items() if vpc in value])
+            return set(self.in_vpcs(value)).union(
+                resource_id for resource_id in attached if self.records[resource_id].vpc is None)
+        self._sort()
+        if key == 'name_prefixes':
+            matched = set()
+            for prefix in value:
+                start = bisect.bisect_left(self.names, (prefix,))
+                for name, resource_id in self.names[start:]:
+                    if not name.startswith(prefix):
+                        break
+                    matched.add(resource_id)
+            return matched
+        # 创建时间早于cutoff的资源即距今超过指定小时数
+        cutoff = now - value * 3600
+        split = bisect.bisect_right(self.created, (cutoff, chr(0x10ffff)))
+        older = self.created[:split] if key == 'min_age_hours' else self.created[split:]
+        return {resource_id for _, resource_id in older}
+
+    # 按规则选出资源ID，保持查询结果中的顺序
+    def select(self, rules, now=None):
+        if not rules:
+            return self.ids
+        now = time.time() if now is None else now
+        selected = set(self.records)
+        for key, value in rules.include.items():
+            selected &= self.lookup(key, value, now, rules.owners)
+        for key, value in rules.exclude.items():
+            selected -= self.lookup(key, value, now, rules.owners)
+        if 'vpc_ids' in rules.exclude:
+            selected = {resource_id for resource_id in selected if not unknown_vpc(self.records[resource_id], rules.owners)}
+        return [resource_id for resource_id in self.records if resource_id in selected]
+
+# 读取过滤规则，默认配置文件不存在时返回空规则（不过滤）；指定的文件不存在或格式错误时返回None
+def load_filter(path=None):
+    try:
+        with open(path or FILTER_FILE, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return FilterRules(config.get('include'), config.get('exclude'))
+    except FileNotFoundError:
+        if path is None:
+            return FilterRules()
+        print(f"错误: 过滤规则 {path} 未找到")
+    except json.JSONDecodeError:
+        print(f"错误: 过滤规则 {path or FILTER_FILE} 格式错误")
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"错误: 过滤规则 {path or FILTER_FILE} 无效: {e}")
+    return None
+
+# 当前生效的过滤规则，由入口脚本在开始删除前设置
+_rules = FilterRules()
+
+def configure_filter(rules):
+    global _rules
+    _rules = rules
+    return _rules
+
+def get_filter():
+    return _rules
@@ -0,0 +1,60 @@
+import json
+import os
+import threading
+import time
+
+# 空资源类型缓存文件
+CACHE_FILE = 'inventory_cache.json'
+# 缓存有效期（秒），超过有效期的记录视为未知，需要重新查询
+CACHE_TTL = 3600
+
+# 空资源类型缓存：按 (项目, 地域, 资源类型) 记录上次运行结束时确认为空的时间，
+# 有效期内的资源类型可以直接跳过查询；仍有剩余资源的资源类型不记录，每次都重新查询；
+# scope为过滤规则的摘要，只使用相同规则下的记录
+class InventoryCache:
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, scope=''):
+        self.path = path
+        self.ttl = ttl
+        self.scope = scope
+        self.lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    @staticmethod
+    def _key(project_id, region, resource):
+        return f"{project_id}|{region}|{resource}"
+
+    # 有效期内是否确认为空
+    def is_empty(self, project_id, region, resource):
+        with self.lock:
+            entry = self.entries.get(self._key(project_id, region, resource))
+        # 旧版本的缓存记录了剩余数量，非0的记录不是空资源类型
+        return (entry is not None and entry.get('count', 0) == 0
+                and time.time() - entry['time'] <= self.ttl and entry.get('scope', '') == self.scope)
+
+    # 记录资源类型已确认为空
+    def mark_empty(self, project_id, region, resource):
+        with self.lock:
+            self.entries[self._key(project_id, region, resource)] = {'time': time.time(), 'scope': self.scope}
+
+    # 使缓存失效，未指定的条件匹配全部
+    def invalidate(self, project_id=None, region=None, resource=None):
+        with self.lock:
+            for key in list(self.entries):
+                key_project, key_region, key_resource = key.split('|', 2)
+                if ((project_id is None or key_project == project_id)
+                        and (region is None or key_region == region)
+                        and (resource is None or key_resource == resource)):
+                    del self.entries[key]
+
+    # 写入文件：先写临时文件再替换，避免中断时损坏缓存
+    def save(self):
+        with self.lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+
+# 断点续跑日志文件
+JOURNAL_FILE = 'sweep_journal.jsonl'
+
+# 追加写入的断点日志：每行记录一次操作的 (项目, 地域, 资源类型, 资源ID, 操作, 结果)，失败时附带失败原因；
+# 续跑时据此跳过本项目已完成的资源类型和已删除成功的资源，多个项目可共用同一个日志文件。同一资源以最后一条记录为准，
+# 删除成功后校验发现仍然存在（leaked）的资源及其所属资源类型不再视为已完成
+class Journal:
+    def __init__(self, path=JOURNAL_FILE, resume=False, project_id=None):
+        self.path = path
+        self.project_id = project_id
+        self.lock = threading.Lock()
+        self.done_ids = set()
+        self.done_nodes = set()
+        # 每个资源最近一次失败的原因
+        self.errors = {}
+        # 本次运行中出现失败的 (项目, 地域, 资源类型)，不会被标记为已完成
+        self.failed_nodes = set()
+        if resume:
+            for entry in self._read():
+                self._apply(entry)
+        else:
+            # 非续跑模式下重新开始记录本项目，保留其他项目的记录
+            self._rewrite([entry for entry in self._read()
+                           if entry.get('project') is not None and entry.get('project') != project_id])
+        self.file = open(path, 'a', encoding='utf-8')
+
+    # 读取已有日志；程序中断时最后一行可能不完整，直接忽略
+    def _read(self):
+        entries = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _rewrite(self, entries):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _apply(self, entry):
+        key = (entry.get('project'), entry.get('region'), entry.get('resource'))
+        if entry.get('outcome') != 'ok':
+            if entry.get('id') is not None:
+                self.done_ids.discard(key + (entry['id'],))
+                self.done_nodes.discard(key)
+                self.errors[key + (entry['id'],)] = entry.get('error')
+            return
+        if entry.get('action') == 'complete':
+            self.done_nodes.add(key)
+        elif entry.get('id') is not None:
+            self.done_ids.add(key + (entry['id'],))
+            self.errors.pop(key + (entry['id'],), None)
+
+    # 追加一条记录并立即落盘
+    def record(self, region, resource, resource_id, action, outcome, error=None):
+        entry = {
+            'time': round(time.time(), 3),
+            'project': self.project_id,
+            'region': region,
+            'resource': resource,
+            'id': resource_id,
+            'action': action,
+            'outcome': outcome
+        }
+        if error is not None:
+            entry['error'] = error
+        with self.lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.file.flush()
+            self._apply(entry)
+            if outcome != 'ok':
+                self.failed_nodes.add((self.project_id, region, resource))
+
+    # 资源是否已删除成功
+    def is_done(self, region, resource, resource_id):
+        return (self.project_id, region, resource, resource_id) in self.done_ids
+
+    # 资源最近一次失败的原因，没有失败记录时返回None
+    def last_error(self, region, resource, resource_id):
+        return self.errors.get((self.project_id, region, resource, resource_id))
+
+    # 某地域的某类资源是否已全部处理完成
+    def node_done(self, region, resource):
+        return (self.project_id, region, resource) in self.done_nodes
+
+    # 标记某地域的某类资源已全部处理完成；本次运行中有删除失败的资源时不标记，续跑时会重新处理
+    def mark_node_done(self, region, resource):
+        if (self.project_id, region, resource) not in self.failed_nodes:
+            self.record(region, resource, None, 'complete', 'ok')
+
+    def close(self):
+        with self.lock:
+            self.file.close()
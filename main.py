@@ -1,453 +1,299 @@
 import json
+import os
 import time
-from common import get_common_headers, post_request
-
-def main(project_id):
+from functools import partial
+from common import api_url, configure_client, get_common_headers, post_request, page_fetcher, list_resources, supports_batch, batch_call, BATCH_SIZE, wait_until, log, start_log_buffer, stop_log_buffer
+from scheduler import run_graph, run_pipeline
+from ratelimit import CONCURRENCY
+from journal import Journal, JOURNAL_FILE
+from inventory import InventoryCache, CACHE_FILE
+from retry_policy import ApiError, describe_failure, succeeded
+from resources import RESOURCES, action_params, describe_query, resource_label
+from filters import get_filter
+from records import parse_response, record_fetcher, record_id
+
+# 删除计划的默认输出文件
+PLAN_FILE = 'sweep_plan.json'
+
+# 同时执行的删除任务数量
+MAX_WORKERS = 16
+# 等待资源关机或删除完成的最长时间（秒）
+WAIT_TIMEOUT = 300
+# 每种资源在单个地域内并发执行删除的线程数
+DELETE_WORKERS = {name: spec['workers'] for name, spec in RESOURCES.items()}
+
+# 读取地域配置，失败时返回None
+def load_regions():
     try:
         # 读取JSON文件，指定编码为utf-8
         with open('region.json', 'r', encoding='utf-8') as f:
-            regions_data = json.load(f)
+            return json.load(f)
     except FileNotFoundError:
         print("错误: region.json文件未找到")
-        return
     except json.JSONDecodeError:
         print("错误: region.json文件格式错误")
-        return
     except Exception as e:
         print(f"发生未知错误: {e}")
+    return None
+
+# plan为 plan.py 生成的删除计划，指定时只删除计划中的资源，不再重新查询；
+# state_dir为断点日志和空资源类型缓存所在的目录，limiter为共用的限流器（如多项目运行时分配的预算）；
+# verify时删除完成后重新查询校验，requeue时立即重新删除残留资源（见 verify.py）；返回各地域的删除结果
+def main(project_id, max_workers=MAX_WORKERS, resume=False, refresh=False, plan=None, state_dir='.', limiter=None,
+         verify=False, requeue=False):
+    regions_data = load_regions() if plan is None else plan_regions(plan)
+    if regions_data is None:
         return
 
-    regions = regions_data.keys()
+    # 连接池大小与在途请求上限一致，保证每个请求都能复用长连接
+    configure_client(pool_size=CONCURRENCY, limiter=limiter)
     common_headers = get_common_headers()
+    results = {region: {'counts': {}, 'errors': []} for region in regions_data}
+    # 记录每个资源的删除结果，中断后可通过 --resume 跳过已完成的部分
+    journal = Journal(os.path.join(state_dir, JOURNAL_FILE), resume=resume, project_id=project_id)
+    # 有效期内确认为空的资源类型直接跳过；--refresh 时清空本项目的缓存，重新查询全部资源；
+    # 缓存的数量只在相同的过滤规则下有效
+    cache = InventoryCache(os.path.join(state_dir, CACHE_FILE), scope=get_filter().fingerprint()) if plan is None else None
+    if refresh and cache is not None:
+        cache.invalidate(project_id)
+
+    # 每个(地域, 资源类型)是一个节点，节点只等待同地域内自身依赖的资源类型删除完成
+    graph = {}
+    for region in regions_data:
+        for name, (_, deps) in RESOURCE_GRAPH.items():
+            graph[(region, name)] = [(region, dep) for dep in deps]
+
+    def run(node):
+        region, name = node
+        ids = None if plan is None else planned_ids(plan, region, name)
+        return sweep_resource(project_id, region, regions_data[region], name, common_headers, journal, cache, ids)
+
+    def on_done(node, result):
+        collect_result(regions_data, results, node, result)
 
-    # 遍历每个区域
-    for region in regions:
-        region_info = regions_data[region]
-        REGION = region_info['Region']
-        ZONE = region_info['Zone']
-
-        print(f"\n\n------------------------------------------------")
-        print(f"操作地域: {region} (Region: {REGION}, Zone: {ZONE})")
-        print(f"------------------------------------------------\n\n")
-
-        # 执行删除UHost、UDisk、EIP、ALB、NATGW等资源
-        try:
-            delete_host(project_id, REGION, ZONE, common_headers)
-            delete_disk(project_id, REGION, ZONE, common_headers)
-            delete_eip(project_id, REGION, ZONE, common_headers)
-            delete_alb(project_id, REGION, ZONE, common_headers)
-            delete_natgw(project_id, REGION, ZONE, common_headers)
-            delete_networkinterface(project_id, REGION, ZONE, common_headers)
-        except Exception as e:
-            print(f"在操作地域 {region} 时发生错误: {e}")
-            continue
-
-    # 再次遍历每个区域，删除子网和VPC
-    for region in regions:
-        region_info = regions_data[region]
-        REGION = region_info['Region']
-        ZONE = region_info['Zone']
-
-        print(f"\n\n-----------------------------------------------")
-        print(f"操作地域: {region} (Region: {REGION}, Zone: {ZONE})")
-        print(f"-----------------------------------------------\n\n")
-
-        try:
-            delete_subnet(project_id, REGION, ZONE, common_headers)
-            delete_vpc(project_id, REGION, ZONE, common_headers)
-        except Exception as e:
-            print(f"在操作地域 {region} 时发生错误: {e}")
-            continue
+    try:
+        run_graph(graph, run, max_workers, on_done)
+    finally:
+        journal.close()
+        if cache is not None:
+            cache.save()
 
+    print_summary(results)
     print("所有操作已完成")
-
-# 删除UHost
-def delete_host(project_id, region, zone, headers):
+    if verify or requeue:
+        from verify import verify_sweep
+        leaks = verify_sweep(project_id, regions_data, plan, requeue, state_dir, max_workers)
+        for region, result in results.items():
+            result['leaked'] = leaks.get(region, {})
+    return results
+
+# 删除计划中的地域配置
+def plan_regions(plan):
+    return {region: {'Region': info['Region'], 'Zone': info['Zone']} for region, info in plan['regions'].items()}
+
+# 删除计划中某个地域某类资源的ID；该资源类型查询失败时返回None，执行时重新查询
+def planned_ids(plan, region, name):
+    return plan['regions'][region]['resources'].get(name)
+
+# 记录节点的删除结果，并整块输出其日志，避免并发执行时输出交错
+def collect_result(regions_data, results, node, result):
+    region, name = node
+    count, errors, lines = result
+    results[region]['counts'][name] = count
+    results[region]['errors'].extend(errors)
+    region_info = regions_data[region]
+    print(f"\n\n------------------------------------------------")
+    print(f"操作地域: {region} (Region: {region_info['Region']}, Zone: {region_info['Zone']}) 资源: {name}")
+    print(f"------------------------------------------------\n\n")
+    for line in lines:
+        print(line)
+
+# 在单个地域内删除一种资源，返回删除数量、错误信息和日志
+def sweep_resource(project_id, region, region_info, name, headers, journal=None, cache=None, ids=None):
+    start_log_buffer()
+    count = 0
+    errors = []
+    if should_skip(project_id, region_info, name, journal, cache):
+        return count, errors, stop_log_buffer()
     try:
-        print("正在查询UHost列表...")
-        timestamp = int(time.time() * 1000)
-        url = 'https://api.ucloud.cn/?Action=DescribeUHostInstance'
-        data = {
-            'ProjectId': project_id,
-            'Region': region,
-            'Limit': 2000,
-            'Offset': 0,
-            'Action': 'DescribeUHostInstance',
-            '_timestamp': timestamp
-        }
-        response = post_request(url, data, headers)
-        if response is None or 'UHostSet' not in response:
-            print("未找到任何UHost")
-            return
-        uhosts = [uhost['UHostId'] for uhost in response['UHostSet']]
-        if not uhosts:
-            print("未找到任何UHost")
-            return
-        print("找到以下UHost：")
-        for uhost in uhosts:
-            print(uhost)
-
-        # 遍历并执行删除操作
-        for uhostid in uhosts:
-            print(f"正在删除UHost: {uhostid}")
-            delete_timestamp = int(time.time() * 1000)
-            # 关机
-            poweroff_url = 'https://api.ucloud.cn/?Action=PoweroffUHostInstance'
-            poweroff_data = {
-                'ProjectId': project_id,
-                'Region': region,
-                'UHostId': uhostid,
-                'Action': 'PoweroffUHostInstance',
-                '_timestamp': delete_timestamp
-            }
-            post_request(poweroff_url, poweroff_data, headers)
-            print("\n等待UHost关机...")
-            time.sleep(3)
-
-            # 删除
-            terminate_url = 'https://api.ucloud.cn/?Action=TerminateUHostInstance'
-            terminate_data = {
-                'ProjectId': project_id,
-                'Region': region,
-                'UHostId': uhostid,
-                'Action': 'TerminateUHostInstance',
-                '_timestamp': delete_timestamp
-            }
-            post_request(terminate_url, terminate_data, headers)
-            print("\n删除完成，等待1秒...")
-            time.sleep(1)
+        func, _ = RESOURCE_GRAPH[name]
+        count, found, settled = func(project_id, region_info['Region'], region_info['Zone'], headers, journal, ids)
+        record_outcome(project_id, region_info, name, count, found, settled, journal, cache)
+        if found is None:
+            errors.append(f"{name}列表查询失败")
     except Exception as e:
-        print(f"在删除UHost时发生错误: {e}")
-
-    print("所有UHost删除操作已完成！")
-
-# 删除UDisk
-def delete_disk(project_id, region, zone, headers):
-    print("正在查询UDisk列表...")
-    timestamp = int(time.time() * 1000)
-    url = 'https://api.ucloud.cn/?Action=DescribeUDisk'
-    data = {
-        'ProjectId': project_id,
-        'Region': region,
-        'HostProduct': 'uhost',
-        'Limit': 2000,
-        'Offset': 0,
-        'Action': 'DescribeUDisk',
-        '_timestamp': timestamp
-    }
-    response = post_request(url, data, headers)
-    if response is None or 'DataSet' not in response:
-        print("未找到任何UDisk")
-        return
-    udisks = [udisk['UDiskId'] for udisk in response['DataSet']]
-    if not udisks:
-        print("未找到任何UDisk")
-        return
-    print("找到以下UDisk：")
-    for udisk in udisks:
-        print(udisk)
-
-    # 遍历并执行删除操作
-    for udisk in udisks:
-        print(f"正在删除UDisk: {udisk}")
-        delete_timestamp = int(time.time() * 1000)
-        delete_url = 'https://api.ucloud.cn/?Action=DeleteUDisk'
-        delete_data = {
-            'ProjectId': project_id,
-            'Region': region,
-            'Zone': zone,
-            'UDiskId': udisk,
-            'DeleteSnapshotService': 'No',
-            'Action': 'DeleteUDisk',
-            '_timestamp': delete_timestamp
-        }
-        post_request(delete_url, delete_data, headers)
-        print("\n删除完成，等待1秒...")
-        time.sleep(1)
-
-    print("所有UDisk删除操作已完成！")
-
-# 删除EIP
-def delete_eip(project_id, region, zone, headers):
-    try:
-        print("正在查询EIP列表...")
-        timestamp = int(time.time() * 1000)
-        url = 'https://api.ucloud.cn/?Action=DescribeEIPWithAllNum'
-        data = {
-            'ProjectId': project_id,
-            'Region': region,
-            'HostProduct': 'uhost',
-            'Limit': 2000,
-            'Offset': 0,
-            'Action': 'DescribeEIPWithAllNum',
-            '_timestamp': timestamp
-        }
-        response = post_request(url, data, headers)
-        if response is None or 'EIPSet' not in response:
-            print("未找到任何EIP")
-            return
-        eips = [eip['EIPId'] for eip in response['EIPSet']]
-        if not eips:
-            print("未找到任何EIP")
-            return
-        print("找到以下EIP：")
-        for eip in eips:
-            print(eip)
-
-        # 遍历并执行删除操作
-        for eip in eips:
-            print(f"正在删除EIP: {eip}")
-            delete_timestamp = int(time.time() * 1000)
-            delete_url = 'https://api.ucloud.cn/?Action=ReleaseEIP'
-            delete_data = {
-                'ProjectId': project_id,
-                'Region': region,
-                'Zone': zone,
-                'EIPId': eip,
-                'ApiVersion': 3,
-                'Action': 'ReleaseEIP',
-                '_timestamp': delete_timestamp
-            }
-            post_request(delete_url, delete_data, headers)
-            print("\n删除完成，等待1秒...")
-            time.sleep(1)
-    except Exception as e:
-        print(f"在删除EIP时发生错误: {e}")
-
-    print("所有EIP删除操作已完成！")
-
-#删除ALB
-def delete_alb(project_id, region, zone, headers):
-    try:
-        print("正在查询ALB列表...")
-        timestamp = int(time.time() * 1000)
-        url = 'https://api.ucloud.cn/?Action=DescribeLoadBalancers'
-        data = {
-            'ProjectId': project_id,
-            'Region': region,
-            'Limit': 100,
-            'Offset': 0,
-            'Action': 'DescribeLoadBalancers',
-            '_timestamp': timestamp
-        }
-        response = post_request(url, data, headers)                              
-        if response is None or 'LoadBalancers' not in response:
-            print("未找到任何ALB")
-        albs = [alb['LoadBalancerId'] for alb in response['LoadBalancers']]        
-        if not albs:
-            print("未找到任何ALB")
-            return
-        print("找到以下ALB：")           
-        for alb in albs:
-            print(alb)
-
-        # 遍历并执行删除操作
-        for albid in albs:
-            print(f"正在删除ALB: {albid}")  
-            delete_url = 'https://api.ucloud.cn/?Action=DeleteLoadBalancer'
-            delete_data = {
-                'ProjectId': project_id,
-                'Zone': zone,
-                'Region': region,
-                'LoadBalancerId': albid,
-                'Action': 'DeleteLoadBalancer',
-                '_timestamp': timestamp
-            }
+        log(f"在操作地域 {region} 删除{name}时发生错误: {e}")
+        errors.append(str(e))
+    return count, errors, stop_log_buffer()
+
+# 断点日志中已完成或缓存有效期内确认为空的资源类型无需再处理
+def should_skip(project_id, region_info, name, journal=None, cache=None):
+    if journal is not None and journal.node_done(region_info['Region'], name):
+        log(f"{name}已在上次运行中处理完成，跳过")
+        return True
+    if cache is not None and cache.is_empty(project_id, region_info['Region'], name):
+        log(f"{name}在缓存有效期内已确认为空，跳过")
+        return True
+    return False
+
+# 把一种资源的处理结果写入断点日志和空资源类型缓存；settled为已删除的资源是否确认从列表中消失
+def record_outcome(project_id, region_info, name, count, found, settled, journal=None, cache=None):
+    # 列表查询失败时不标记为已完成，续跑时重新处理
+    if journal is not None and found is not None:
+        journal.mark_node_done(region_info['Region'], name)
+    # 查询成功、已全部删除且确认删除完成时记录为空；查询失败、仍有剩余或等待删除超时时清除记录，下次重新查询
+    if cache is not None:
+        if found is not None and found == count and settled:
+            cache.mark_empty(project_id, region_info['Region'], name)
+        else:
+            cache.invalidate(project_id, region_info['Region'], name)
+
+# 输出各地域的删除汇总
+def print_summary(results):
+    print(f"\n\n================ 删除汇总 ================")
+    for region, result in results.items():
+        counts = '，'.join(f"{name}: {result['counts'][name]}" for name in RESOURCE_GRAPH if name in result['counts'])
+        print(f"{region}: {counts or '无'}")
+        for error in result['errors']:
+            print(f"  错误: {error}")
+    print(f"==========================================\n")
+
+# 包装单个资源的删除函数（返回删除接口的响应）：续跑时跳过日志中已删除成功的资源，
+# 并把删除结果和失败原因写入日志；返回是否删除成功
+def journaled(journal, region, name, action, handle):
+    def wrapper(resource_id):
+        if journal is not None and journal.is_done(region, name, resource_id):
+            log(f"{name} {resource_id} 已在上次运行中删除，跳过")
+            return True
+        response = handle(resource_id)
+        ok = succeeded(response)
+        if journal is not None:
+            journal.record(region, name, resource_id, action, 'ok' if ok else 'failed', None if ok else describe_failure(response))
+        return ok
+    return wrapper
+
+# 分页查询一类资源的ID，每页解析为资源记录后返回其中满足过滤规则的ID；接口支持的过滤条件直接作为查询参数
+def iter_ids(name, region, url, data, headers):
+    spec = RESOURCES[name]
+    rules = get_filter()
+    query = dict(data, **rules.query_params(spec))
+    fetch_page = record_fetcher(page_fetcher(url, query, headers), name, region)
+    skipped = 0
+    for record in list_resources(fetch_page, spec['set_key'], record_id, spec['limit']):
+        rules.remember(record)
+        if rules.matches(record):
+            yield record.id
+        else:
+            skipped += 1
+    if skipped:
+        log(f"按过滤规则跳过 {skipped} 个资源")
+
+# 轮询查询接口，等待一类资源中的指定资源从列表中消失；指定state时等待资源进入该状态（或已不存在）
+def wait_for_resources(name, region, url, data, headers, ids, state=None, timeout=WAIT_TIMEOUT):
+    spec = RESOURCES[name]
+    set_key, id_key = spec['set_key'], spec['id_key']
+    pending = set(ids)
+    if not pending:
+        return True
+
+    # 接口支持按ID批量查询时只查询尚未完成的资源，否则分页查询全部资源；查询结果解析为资源记录
+    def describe_pending():
+        if not supports_batch(data['Action']):
+            fetch_page = record_fetcher(page_fetcher(url, data, headers), name, region)
             try:
-                post_request(delete_url, delete_data, headers)
-                print("\n删除完成，等待1秒...")
-                time.sleep(1)
-            except Exception as e:
-                print(f"在删除ALB {albid} 时发生错误: {e}")
-                continue
-    except Exception as e:
-        print(f"在查询ALB时发生错误: {e}")
-        return
-
-    print("所有ALB删除操作已完成！")
-
-# 删除NAT网关
-def delete_natgw(project_id, region, zone, headers):
-    try:
-        print("正在查询NAT网关列表...")
-        timestamp = int(time.time() * 1000)
-        url = 'https://api.ucloud.cn/?Action=DescribeNATGW'
-        data = {
-            'ProjectId': project_id,
-            'Region': region,          
-            'Limit': 100,
-            'Offset': 0,
-            'Action': 'DescribeNATGW',
-            '_timestamp': timestamp
-        }
-        response = post_request(url, data, headers)
-        if response is None or 'DataSet' not in response:
-            print("未找到任何NAT网关")
-            return
-        natgws = [natgw['NATGWId'] for natgw in response['DataSet']]        
-        print("找到以下NAT网关：")        
-        for natgw in natgws:
-            print(natgw)
-
-        # 遍历并执行删除操作
-        for natgwid in natgws:
-            print(f"正在删除natgw: {natgwid}")
-            delete_url = 'https://api.ucloud.cn/?Action=DeleteNATGW'
-            delete_data = {
-                'ProjectId': project_id,
-                'Zone': zone,
-                'Region': region,
-                'ReleaseEip': 'true',
-                'NATGWId': natgwid,
-                'Action': 'DeleteNATGW',
-                '_timestamp': timestamp
-            }
-            post_request(delete_url, delete_data, headers)
-            print("\n删除完成，等待1秒...")
-            time.sleep(1)
-    except Exception as e:
-        print(f"在删除natgw时发生错误: {e}")
-
-    print("所有NAT网关删除操作已完成！")
+                return list(list_resources(fetch_page, set_key, record_id, data['Limit'])), set()
+            except ApiError:
+                # 查询失败时视为均未完成
+                return [], set(pending)
+
+        def call(params):
+            return post_request(url, dict(params, _timestamp=int(time.time() * 1000)), headers)
+
+        records = []
+        unknown = set()
+        query = dict(data, Offset=0, Limit=BATCH_SIZE)
+        for chunk, response in batch_call(call, query, id_key, sorted(pending)):
+            response = parse_response(response, name, region)
+            if response is None or set_key not in response:
+                # 查询失败的资源视为尚未完成
+                unknown.update(chunk)
+            else:
+                records.extend(response[set_key])
+        return records, unknown
+
+    def check():
+        records, remaining = describe_pending()
+        for record in records:
+            if record.id in pending and (state is None or record.state != state):
+                remaining.add(record.id)
+        pending.intersection_update(remaining)
+        return not pending
+
+    if wait_until(check, timeout):
+        return True
+    log(f"等待{resource_label(name)}{'进入' + state + '状态' if state else '删除完成'}超时（{timeout}秒）")
+    return False
+
+# 删除某个地域中的一种资源：边查询边由多个线程并发删除（需要先关机的资源先关机并等待关机完成），
+# 随后等待已删除的资源从列表中消失，依赖它的资源才能继续删除。
+# 返回(删除数量, 查询到的数量, 是否确认删除完成)，查询失败时查询到的数量为None
+def delete_resources(name, project_id, region, zone, headers, journal=None, ids=None):
+    spec = RESOURCES[name]
+    label = resource_label(name)
+    workers = DELETE_WORKERS[name]
+    deleted = []
+    found = None
+    settled = False
+    url = api_url(spec['describe'])
+    data = dict(describe_query(spec, project_id, region), _timestamp=int(time.time() * 1000))
+
+    def call(action, params, resource_id):
+        payload = action_params(spec, action, params, project_id, region, zone, resource_id)
+        payload['_timestamp'] = int(time.time() * 1000)
+        return post_request(api_url(action), payload, headers)
+
+    def delete_one(resource_id):
+        log(f"正在删除{label}: {resource_id}")
+        return call(spec['delete'], spec['delete_params'], resource_id)
 
-# 删除虚拟网卡
-def delete_networkinterface(project_id, region, zone, headers):
     try:
-        print("正在查询虚拟网卡列表...")
-        timestamp = int(time.time() * 1000)
-        url = 'https://api.ucloud.cn/?Action=DescribeNetworkInterface'
-        data = {
-            'ProjectId': project_id,
-            'Region': region,          
-            'Limit': 100,
-            'Offset': 0,
-            'Action': 'DescribeNetworkInterface',
-            '_timestamp': timestamp
-        }
-        response = post_request(url, data, headers)
-        if response is None or 'NetworkInterfaceSet' not in response:
-            print("未找到任何虚拟网卡")
-            return
-        networkinterfaces = [networkinterface['InterfaceId'] for networkinterface in response['NetworkInterfaceSet']]   
-        print("找到以下虚拟网卡：")
-        for networkinterface in networkinterfaces:
-            print(networkinterface)
-
-        # 遍历并执行删除操作
-        for networkinterface in networkinterfaces:
-            print(f"正在删除虚拟网卡: {networkinterface}")
-            delete_url = 'https://api.ucloud.cn/?Action=DeleteNetworkInterface'
-            delete_data = {
-                'ProjectId': project_id,
-                'Zone': zone,
-                'Region': region,                
-                'InterfaceId': networkinterface,
-                'Action': 'DeleteNetworkInterface',                
-                '_timestamp': timestamp
-            }
-            post_request(delete_url, delete_data, headers)
-            print("\n删除完成，等待1秒...")
-            time.sleep(1)
+        log(f"正在查询{label}列表...")
+        # 执行删除计划时直接使用计划中的资源ID，否则分页查询；查询与删除通过有界队列衔接，查询到一页即由多个线程并发处理
+        if ids is None:
+            ids = iter_ids(name, region, url, data, headers)
+        poweroff = spec.get('poweroff')
+        if poweroff:
+            def poweroff_one(resource_id):
+                log(f"正在关机{label}: {resource_id}")
+                call(poweroff['action'], {}, resource_id)
+                return True
+
+            ids, found = run_pipeline(ids, poweroff_one, workers)
+            if found:
+                log(f"\n等待{label}关机...")
+                wait_for_resources(name, region, url, data, headers, ids, state=poweroff['state'])
+            deleted, _ = run_pipeline(ids, journaled(journal, region, name, spec['delete'], delete_one), workers)
+        else:
+            deleted, found = run_pipeline(ids, journaled(journal, region, name, spec['delete'], delete_one), workers)
+
+        if not found:
+            log(f"未找到任何{label}")
+            return 0, 0, True
+
+        settled = wait_for_resources(name, region, url, data, headers, deleted)
     except Exception as e:
-        print(f"在删除虚拟网卡时发生错误: {e}")
-        
-    print("所有虚拟网卡删除操作已完成！")
+        log(f"在删除{label}时发生错误: {e}")
 
-# 删除子网
-def delete_subnet(project_id, region, zone, headers):
-    try:
-        print("正在查询子网列表...")
-        timestamp = int(time.time() * 1000)
-        url = 'https://api.ucloud.cn/?Action=DescribeSubnet'
-        data = {
-            'ProjectId': project_id,
-            'Region': region,
-            'ShowAvailableIPs': True,
-            'IgnoreResource': True,
-            'Limit': 2000,
-            'Offset': 0,
-            'Action': 'DescribeSubnet',
-            '_timestamp': timestamp
-        }
-        response = post_request(url, data, headers)
-        if response is None or 'DataSet' not in response:
-            print("未找到任何子网")
-            return
-        subnets = [subnet['SubnetId'] for subnet in response['DataSet']]        
-        print("找到以下子网：")
-        for subnet in subnets:
-            print(subnet)
-
-        # 遍历并执行删除操作
-        for subnetid in subnets:
-            print(f"正在删除子网: {subnetid}")
-            delete_url = 'https://api.ucloud.cn/?Action=DeleteSubnet'
-            delete_data = {
-                'ProjectId': project_id,
-                'Zone': zone,
-                'Region': region,
-                'SubnetId': subnetid,
-                'Action': 'DeleteSubnet',
-                '_timestamp': timestamp
-            }
-            post_request(delete_url, delete_data, headers)
-            print("\n删除完成，等待1秒...")
-            time.sleep(1)
-    except Exception as e:
-        print(f"在删除子网时发生错误: {e}")
-
-    print("所有子网删除操作已完成！")
-
-# 删除VPC
-def delete_vpc(project_id, region, zone, headers):
-    try:
-        print("正在查询VPC列表...")
-        timestamp = int(time.time() * 1000)
-        url = 'https://api.ucloud.cn/?Action=DescribeVPC'
-        data = {
-            'ProjectId': project_id,
-            'Region': region,
-            'Limit': 2000,
-            'Offset': 0,
-            'Action': 'DescribeVPC',
-            '_timestamp': timestamp
-        }
-        response = post_request(url, data, headers)
-        if response is None or 'DataSet' not in response:
-            print("未找到任何VPC")
-            return
-        # 检查 DataSet 是否为 None 或非可迭代对象（如空值）
-        data_set = response['DataSet']
-        if data_set is None or not isinstance(data_set, (list, tuple)):
-            print("VPC列表格式异常（DataSet为空或非列表）")
-            return    
-        vpcs = [vpc['VPCId'] for vpc in data_set]
-        print("找到以下VPC：")
-        for vpc in vpcs:
-            print(vpc)
-
-        # 遍历并执行删除操作
-        for vpcid in vpcs:
-            print(f"正在删除VPC: {vpcid}")
-            delete_timestamp = int(time.time() * 1000)
-            delete_url = 'https://api.ucloud.cn/?Action=DeleteVPC'
-            delete_data = {
-                'ProjectId': project_id,
-                'Region': region,
-                'VPCId': vpcid,
-                'Action': 'DeleteVPC',
-                '_timestamp': delete_timestamp
-            }
-            post_request(delete_url, delete_data, headers)
-            print("\n删除完成，等待1秒...")
-            time.sleep(1)
-    except Exception as e:
-        print(f"在删除VPC时发生错误: {e}")
+    log(f"所有{label}删除操作已完成！")
+    return len(deleted), found, settled
 
-    print("所有VPC删除操作已完成！")
+# 资源删除依赖关系：资源类型 -> (删除函数, 需要先删除完成的资源类型)，由 resources.py 中的注册表生成
+RESOURCE_GRAPH = {name: (partial(delete_resources, name), spec['depends']) for name, spec in RESOURCES.items()}
 
 # 设置项目ID
 ProjectId = 'org-n4wmt0'
-# 调用主函数
+# 调用主函数（命令行参数见 cli.py 的 sweep 子命令）
 if __name__ == '__main__':
-    main(ProjectId)
\ No newline at end of file
+    import sys
+    from cli import run
+    sys.exit(run(['sweep', *sys.argv[1:]]))
@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+import time
+
+# 运行报告的默认输出文件
+REPORT_FILE = 'sweep_report.json'
+# 请求耗时直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+# 单个接口的请求耗时直方图
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    # 按桶内线性插值估算分位数
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+# 运行指标：按接口统计请求耗时、失败和重试次数、收发字节数，以及等待时间的构成
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # 附加到运行报告中的其他统计：名称 -> 返回统计内容的函数（如接入点的延迟和状态）
+        self.sections = {}
+        self.reset()
+
+    # 登记附加到运行报告中的统计，同名的统计以最后登记的为准；provider为None时取消登记
+    def add_section(self, name, provider):
+        with self.lock:
+            if provider is None:
+                self.sections.pop(name, None)
+            else:
+                self.sections[name] = provider
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.actions = {}
+            self.sleeps = {}
+
+    def _action(self, action):
+        stats = self.actions.get(action)
+        if stats is None:
+            stats = self.actions[action] = {
+                'latency': Histogram(), 'errors': 0, 'retries': 0,
+                'bytes_sent': 0, 'bytes_received': 0
+            }
+        return stats
+
+    # 记录一次请求
+    def record_request(self, action, seconds, bytes_sent=0, bytes_received=0, error=False):
+        with self.lock:
+            stats = self._action(action or 'unknown')
+            stats['latency'].observe(seconds)
+            stats['bytes_sent'] += bytes_sent
+            stats['bytes_received'] += bytes_received
+            if error:
+                stats['errors'] += 1
+
+    # 记录一次重试
+    def record_retry(self, action):
+        with self.lock:
+            self._action(action or 'unknown')['retries'] += 1
+
+    # 记录等待时间，kind 区分轮询等待、重试退避和限流等待
+    def record_sleep(self, kind, seconds):
+        with self.lock:
+            self.sleeps[kind] = self.sleeps.get(kind, 0.0) + seconds
+
+    # 已发送的请求总数
+    def calls(self):
+        with self.lock:
+            return sum(stats['latency'].count for stats in self.actions.values())
+
+    # 生成运行报告
+    def report(self):
+        with self.lock:
+            sections = dict(self.sections)
+            elapsed = time.time() - self.started
+            actions = {}
+            for action, stats in sorted(self.actions.items()):
+                latency = stats['latency']
+                actions[action] = {
+                    'calls': latency.count,
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'p50': round(latency.quantile(0.5), 4),
+                    'p95': round(latency.quantile(0.95), 4),
+                    'p99': round(latency.quantile(0.99), 4),
+                    'mean': round(latency.sum / latency.count, 4) if latency.count else 0,
+                    'max': round(latency.max, 4),
+                    'network_seconds': round(latency.sum, 3),
+                    'bytes_sent': stats['bytes_sent'],
+                    'bytes_received': stats['bytes_received'],
+                }
+            calls = sum(item['calls'] for item in actions.values())
+            report = {
+                'started': round(self.started, 3),
+                'wall_seconds': round(elapsed, 3),
+                'calls': calls,
+                'calls_per_second': round(calls / elapsed, 2) if elapsed else 0,
+                'network_seconds': round(sum(item['network_seconds'] for item in actions.values()), 3),
+                'sleep_seconds': {kind: round(seconds, 3) for kind, seconds in sorted(self.sleeps.items())},
+                'actions': actions,
+            }
+        # 附加的统计有各自的锁，在释放本对象的锁之后获取
+        for name, provider in sections.items():
+            report[name] = provider()
+        return report
+
+    # 以JSON格式写入运行报告
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    # 以Prometheus textfile格式写入指标，先写临时文件再替换，避免采集到不完整的文件
+    def write_prometheus(self, path):
+        lines = [
+            '# HELP del_script_request_seconds API request latency in seconds.',
+            '# TYPE del_script_request_seconds histogram',
+        ]
+        with self.lock:
+            for action, stats in sorted(self.actions.items()):
+                latency = stats['latency']
+                cumulative = 0
+                for bound, count in zip(latency.buckets, latency.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'del_script_request_seconds_bucket{{action="{action}",le="{le}"}} {cumulative}')
+                lines.append(f'del_script_request_seconds_sum{{action="{action}"}} {latency.sum}')
+                lines.append(f'del_script_request_seconds_count{{action="{action}"}} {latency.count}')
+            for name, key, help_text in (
+                    ('del_script_request_errors_total', 'errors', 'Failed API requests.'),
+                    ('del_script_request_retries_total', 'retries', 'Retried API requests.'),
+                    ('del_script_bytes_sent_total', 'bytes_sent', 'Request bytes sent.'),
+                    ('del_script_bytes_received_total', 'bytes_received', 'Response bytes received.')):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for action, stats in sorted(self.actions.items()):
+                    lines.append(f'{name}{{action="{action}"}} {stats[key]}')
+            lines.append('# HELP del_script_sleep_seconds_total Time spent sleeping by reason.')
+            lines.append('# TYPE del_script_sleep_seconds_total counter')
+            for kind, seconds in sorted(self.sleeps.items()):
+                lines.append(f'del_script_sleep_seconds_total{{kind="{kind}"}} {seconds}')
+            lines.append('# HELP del_script_run_seconds Wall time of the run.')
+            lines.append('# TYPE del_script_run_seconds gauge')
+            lines.append(f'del_script_run_seconds {time.time() - self.started}')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    # 运行结束时输出简要统计，并写入JSON报告和可选的Prometheus textfile
+    def save(self, report_path=REPORT_FILE, prometheus_path=None):
+        print(summary_line(self.report()))
+        if report_path:
+            self.write_report(report_path)
+            print(f"运行报告已写入 {report_path}")
+        if prometheus_path:
+            self.write_prometheus(prometheus_path)
+            print(f"Prometheus 指标已写入 {prometheus_path}")
+
+# 运行报告的汇总：请求总数、吞吐量、网络耗时和等待耗时
+def summary_line(report):
+    sleeps = '，'.join(f'{kind} {seconds}s' for kind, seconds in report['sleep_seconds'].items()) or '无'
+    return (f"共发送请求 {report['calls']} 次，耗时 {report['wall_seconds']}s，"
+            f"平均 {report['calls_per_second']} 次/秒，网络耗时 {report['network_seconds']}s，等待耗时: {sleeps}")
+
+# 读取运行报告，文件不存在或格式错误时返回None
+def load_report(path=REPORT_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except FileNotFoundError:
+        print(f"错误: 运行报告 {path} 未找到")
+        return None
+    except json.JSONDecodeError:
+        print(f"错误: 运行报告 {path} 格式错误")
+        return None
+    if not isinstance(report, dict) or 'actions' not in report:
+        print(f"错误: {path} 不是运行报告")
+        return None
+    return report
+
+# 输出运行报告：汇总和按接口统计的请求次数、失败和重试次数、耗时分位数，按网络耗时从高到低排列
+def print_report(report):
+    print(summary_line(report))
+    for action, stats in sorted(report['actions'].items(), key=lambda item: -item[1]['network_seconds']):
+        print(f"  {action}: {stats['calls']} 次，失败 {stats['errors']}，重试 {stats['retries']}，"
+              f"p50 {stats['p50']}s，p95 {stats['p95']}s，p99 {stats['p99']}s，网络耗时 {stats['network_seconds']}s")
+    for endpoint, stats in report.get('endpoints', {}).items():
+        rtt = f"{stats['rtt'] * 1000:.1f}ms" if stats['rtt'] is not None else '-'
+        latency = '，'.join(f"{region} {seconds}s" for region, seconds in stats['latency'].items()) or '无'
+        print(f"  接入点 {endpoint}: 探测延迟 {rtt}，失败 {stats['failures']} 次{'（停用中）' if stats['down'] else ''}，各地域平均耗时: {latency}")
+
+# 全局共享的运行指标
+METRICS = Metrics()
@@ -0,0 +1,393 @@
+import argparse
+import heapq
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+# 本地模拟的 UCloud API，用于在不访问生产环境的情况下测试和压测删除脚本
+
+# 各查询接口返回的资源类型、列表字段、ID字段，以及按ID批量查询时的数组参数名
+DESCRIBE_ACTIONS = {
+    'DescribeUHostInstance': ('UHost', 'UHostSet', 'UHostId', 'UHostIds'),
+    'DescribeUDisk': ('UDisk', 'DataSet', 'UDiskId', None),
+    'DescribeEIPWithAllNum': ('EIP', 'EIPSet', 'EIPId', None),
+    'DescribeLoadBalancers': ('ALB', 'LoadBalancers', 'LoadBalancerId', None),
+    'DescribeNATGW': ('NATGW', 'DataSet', 'NATGWId', 'NATGWIds'),
+    'DescribeNetworkInterface': ('虚拟网卡', 'NetworkInterfaceSet', 'InterfaceId', 'InterfaceId'),
+    'DescribeSubnet': ('子网', 'DataSet', 'SubnetId', 'SubnetIds'),
+    'DescribeVPC': ('VPC', 'DataSet', 'VPCId', 'VPCIds'),
+}
+# 各删除接口删除的资源类型及ID参数名
+DELETE_ACTIONS = {
+    'TerminateUHostInstance': ('UHost', 'UHostId'),
+    'DeleteUDisk': ('UDisk', 'UDiskId'),
+    'ReleaseEIP': ('EIP', 'EIPId'),
+    'DeleteLoadBalancer': ('ALB', 'LoadBalancerId'),
+    'DeleteNATGW': ('NATGW', 'NATGWId'),
+    'DeleteNetworkInterface': ('虚拟网卡', 'InterfaceId'),
+    'DeleteSubnet': ('子网', 'SubnetId'),
+    'DeleteVPC': ('VPC', 'VPCId'),
+}
+# 资源ID前缀
+ID_PREFIXES = {
+    'UHost': 'uhost', 'UDisk': 'bsm', 'EIP': 'eip', 'ALB': 'alb', 'NATGW': 'natgw',
+    '虚拟网卡': 'uni', '子网': 'subnet', 'VPC': 'uvnet', 'UGN': 'ugn',
+}
+# 表示资源所属VPC、子网的字段：VPC、子网内仍有资源时不能删除
+CONTAINER_KEYS = ('VPCId', 'SubnetId')
+# 表示资源挂载在哪台UHost上的字段：UHost未删除时不能删除挂载在其上的资源
+ATTACH_KEYS = ('UHostId', 'ResourceId', 'AttachInstanceId')
+# 模拟返回的错误码
+RETCODE_NOT_FOUND = 8039
+RETCODE_DEPENDENCY = 8046
+RETCODE_THROTTLED = 172
+RETCODE_INTERNAL = 5000
+RETCODE_UNKNOWN_ACTION = 160
+
+# 模拟服务的可调参数
+class MockConfig:
+    def __init__(self, latency=0.02, jitter=0.01, page_size=None, throttle_rate=None,
+                 error_rate=0.0, http_error_rate=0.0, transition=0.5, seed=None):
+        # 每个请求的基础延迟及随机抖动（秒）
+        self.latency = latency
+        self.jitter = jitter
+        # 每页最多返回的资源数，None表示按请求的Limit返回
+        self.page_size = page_size
+        # 每个接口每秒允许的请求数，超出时返回限流错误，None表示不限流
+        self.throttle_rate = throttle_rate
+        # 随机返回RetCode错误和HTTP 502的概率
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        # 关机、删除等操作从发起到生效的时间（秒）
+        self.transition = transition
+        self.random = random.Random(seed)
+
+# 模拟的 UCloud 资源清单及接口实现
+class MockUCloud:
+    def __init__(self, config=None):
+        self.config = config or MockConfig()
+        self.lock = threading.Lock()
+        # {(地域, 资源类型): {资源ID: 资源属性}}
+        self.inventory = {}
+        # VPC、子网及UGN绑定网络内的资源 {VPC/子网ID: {资源ID}}
+        self.refs = {}
+        # 延迟生效的操作，按生效时间排列的堆 [(生效时间, 地域, 资源类型, 资源ID, 操作)]
+        self.pending = []
+        self.calls = {}
+        self.throttled = 0
+        self.errors = 0
+        self.windows = {}
+        # 模拟的项目列表；设置后按 (项目, 地域) 分别生成和查询资源
+        self.projects = []
+
+    # 生成合成资源清单：每个地域每类资源count个（可通过counts按类型指定），第i个子网属于第i个VPC，
+    # 第i个UHost、ALB、虚拟网卡位于第i个子网，第i个UDisk、EIP、虚拟网卡挂在第i个UHost上，依此类推；
+    # 每类资源的前keep个标记为需要保留的资源（Tag为keep，名称以prod-开头），其余为拨测任务创建的资源
+    def seed(self, regions, count=100, counts=None, keep=0):
+        counts = dict(dict.fromkeys(ID_PREFIXES, count), **(counts or {}))
+        now = int(time.time())
+        with self.lock:
+            for region in regions:
+                ids = {kind: [f"{ID_PREFIXES[kind]}-{region}-{i}" for i in range(counts[kind])] for kind in ID_PREFIXES}
+
+                def pick(kind, i):
+                    return ids[kind][i % len(ids[kind])] if ids[kind] else None
+
+                for resource_id in ids['VPC']:
+                    self._add(region, 'VPC', resource_id, {})
+                for i, resource_id in enumerate(ids['子网']):
+                    self._add(region, '子网', resource_id, {'VPCId': pick('VPC', i)})
+                for kind in ('UHost', 'ALB', '虚拟网卡'):
+                    for i, resource_id in enumerate(ids[kind]):
+                        subnet = pick('子网', i)
+                        attrs = {'VPCId': self._get(region, '子网', subnet)['VPCId'] if subnet else None, 'SubnetId': subnet}
+                        if kind == 'UHost':
+                            attrs['State'] = 'Running'
+                        if kind == '虚拟网卡':
+                            attrs['AttachInstanceId'] = pick('UHost', i)
+                        self._add(region, kind, resource_id, attrs)
+                for i, resource_id in enumerate(ids['NATGW']):
+                    self._add(region, 'NATGW', resource_id, {'VPCId': pick('VPC', i)})
+                for i, resource_id in enumerate(ids['UDisk']):
+                    self._add(region, 'UDisk', resource_id, {'UHostId': pick('UHost', i)})
+                for i, resource_id in enumerate(ids['EIP']):
+                    self._add(region, 'EIP', resource_id, {'ResourceId': pick('UHost', i)})
+                for i, resource_id in enumerate(ids['UGN']):
+                    self._add(region, 'UGN', resource_id, {'Networks': [pick('VPC', i)] if ids['VPC'] else []})
+                for kind in ID_PREFIXES:
+                    for i, attrs in enumerate(self.inventory.get((region, kind), {}).values()):
+                        if i < keep:
+                            attrs.update(Name='prod-service', Tag='keep', CreateTime=now)
+                        else:
+                            attrs.update(Name='probe-task', Tag='Default', CreateTime=now)
+
+    # 多项目时资源清单按 项目/地域 区分
+    @staticmethod
+    def scope(project, region):
+        return f"{project}/{region}"
+
+    # 添加资源，并记录其所属的VPC、子网和绑定的UGN，用于删除时检查依赖
+    def _add(self, region, kind, resource_id, attrs):
+        self.inventory.setdefault((region, kind), {})[resource_id] = attrs
+        for container in self._containers(attrs):
+            self.refs.setdefault(container, set()).add(resource_id)
+
+    def _containers(self, attrs):
+        return [attrs[key] for key in CONTAINER_KEYS if attrs.get(key)] + attrs.get('Networks', [])
+
+    def _get(self, region, kind, resource_id):
+        return self.inventory.get((region, kind), {}).get(resource_id)
+
+    def _remove(self, region, kind, resource_id):
+        attrs = self.inventory.get((region, kind), {}).pop(resource_id, None)
+        if attrs is not None:
+            for container in self._containers(attrs):
+                self.refs.get(container, set()).discard(resource_id)
+
+    # 执行已到生效时间的关机和删除操作
+    def _advance(self):
+        now = time.monotonic()
+        while self.pending and self.pending[0][0] <= now:
+            _, region, kind, resource_id, operation = heapq.heappop(self.pending)
+            if operation == 'stop':
+                attrs = self._get(region, kind, resource_id)
+                if attrs is not None:
+                    attrs['State'] = 'Stopped'
+            else:
+                self._remove(region, kind, resource_id)
+
+    # 按接口统计每秒请求数，超过throttle_rate时视为限流
+    def _throttle(self, action):
+        rate = self.config.throttle_rate
+        if not rate:
+            return False
+        second = int(time.monotonic())
+        window, count = self.windows.get(action, (second, 0))
+        if window != second:
+            window, count = second, 0
+        self.windows[action] = (window, count + 1)
+        return count >= rate
+
+    # 剩余资源数量 {资源类型: 数量}
+    def remaining(self):
+        with self.lock:
+            self._advance()
+            counts = {}
+            for (_, kind), items in self.inventory.items():
+                counts[kind] = counts.get(kind, 0) + len(items)
+            return counts
+
+    # 调用统计
+    def stats(self):
+        with self.lock:
+            return {
+                'calls': sum(self.calls.values()),
+                'actions': dict(self.calls),
+                'throttled': self.throttled,
+                'errors': self.errors,
+            }
+
+    # 处理一次请求，返回(HTTP状态码, 响应内容)
+    def handle(self, params):
+        config = self.config
+        delay = config.latency + config.random.uniform(0, config.jitter) if config.jitter else config.latency
+        if delay > 0:
+            time.sleep(delay)
+        action = params.get('Action')
+        with self.lock:
+            self.calls[action] = self.calls.get(action, 0) + 1
+            if self._throttle(action):
+                self.throttled += 1
+                return 200, {'RetCode': RETCODE_THROTTLED, 'Message': '请求过于频繁，请稍后再试', 'Action': action}
+            if config.http_error_rate and config.random.random() < config.http_error_rate:
+                self.errors += 1
+                return 502, {'Message': 'Bad Gateway'}
+            if config.error_rate and config.random.random() < config.error_rate:
+                self.errors += 1
+                return 200, {'RetCode': RETCODE_INTERNAL, 'Message': '服务内部错误', 'Action': action}
+            self._advance()
+            body = self._dispatch(action, params)
+        body.setdefault('RetCode', 0)
+        body['Action'] = action + 'Response' if action else None
+        return 200, body
+
+    def _dispatch(self, action, params):
+        if action == 'GetProjectList':
+            projects = [{'ProjectId': project, 'ProjectName': project} for project in self.projects]
+            return {'ProjectCount': len(projects), 'ProjectSet': projects}
+        region = self.scope(params.get('ProjectId'), params.get('Region')) if self.projects else params.get('Region')
+        if action in DESCRIBE_ACTIONS:
+            kind, set_key, id_key, array_param = DESCRIBE_ACTIONS[action]
+            return self._describe(region, kind, set_key, id_key, array_param, params)
+        if action == 'PoweroffUHostInstance':
+            attrs = self._get(region, 'UHost', params.get('UHostId'))
+            if attrs is None:
+                return {'RetCode': RETCODE_NOT_FOUND, 'Message': '资源不存在'}
+            if attrs['State'] == 'Running':
+                attrs['State'] = 'Stopping'
+                heapq.heappush(self.pending, (time.monotonic() + self.config.transition, region, 'UHost', params['UHostId'], 'stop'))
+            return {}
+        if action in DELETE_ACTIONS:
+            kind, id_param = DELETE_ACTIONS[action]
+            return self._delete(region, kind, params.get(id_param))
+        if action == 'ListUGN':
+            return self._describe(region, 'UGN', 'UGNs', 'UGNID', None, params)
+        if action == 'GetUGNNetworks':
+            attrs = self._get(region, 'UGN', params.get('UGNID'))
+            if attrs is None:
+                return {'RetCode': RETCODE_NOT_FOUND, 'Message': '资源不存在'}
+            return {'Networks': [{'NetworkID': network, 'Region': region} for network in attrs['Networks']]}
+        if action == 'DetachUGNNetworks':
+            ugnid = params.get('UGNID')
+            attrs = self._get(region, 'UGN', ugnid)
+            if attrs is None:
+                return {'RetCode': RETCODE_NOT_FOUND, 'Message': '资源不存在'}
+            networks = [value for key, value in params.items() if key.startswith('Networks[')]
+            for network in networks:
+                if network in attrs['Networks']:
+                    attrs['Networks'].remove(network)
+                    self.refs.get(network, set()).discard(ugnid)
+            return {}
+        if action == 'DelUGN':
+            attrs = self._get(region, 'UGN', params.get('UGNID'))
+            if attrs is None:
+                return {'RetCode': RETCODE_NOT_FOUND, 'Message': '资源不存在'}
+            if attrs['Networks']:
+                return {'RetCode': RETCODE_DEPENDENCY, 'Message': 'UGN仍绑定网络实例'}
+            self._remove(region, 'UGN', params['UGNID'])
+            return {}
+        return {'RetCode': RETCODE_UNKNOWN_ACTION, 'Message': f'Action [{action}] not exists'}
+
+    # 分页查询，按page_size限制每页数量；传入ID数组参数时只返回指定的资源
+    def _describe(self, region, kind, set_key, id_key, array_param, params):
+        items = self.inventory.get((region, kind), {})
+        if array_param:
+            wanted = [value for key, value in params.items() if key.startswith(array_param + '.')]
+            if wanted:
+                items = {resource_id: items[resource_id] for resource_id in wanted if resource_id in items}
+        # 按标签和所属VPC过滤
+        for param in ('Tag', 'VPCId'):
+            if params.get(param):
+                items = {resource_id: attrs for resource_id, attrs in items.items() if attrs.get(param) == params[param]}
+        offset = int(params.get('Offset', 0))
+        limit = int(params.get('Limit', 20))
+        if self.config.page_size:
+            limit = min(limit, self.config.page_size)
+        ids = list(items)
+        page = [dict(items[resource_id], **{id_key: resource_id}) for resource_id in ids[offset:offset + limit]]
+        for item in page:
+            item.pop('Networks', None)
+            item.pop('Deleting', None)
+        return {'TotalCount': len(ids), set_key: page}
+
+    # 删除资源：仍挂载在UHost上、VPC或子网内仍有资源、UHost未关机时返回错误，否则在transition秒后从列表中消失
+    def _delete(self, region, kind, resource_id):
+        attrs = self._get(region, kind, resource_id)
+        if attrs is None or attrs.get('Deleting'):
+            return {'RetCode': RETCODE_NOT_FOUND, 'Message': '资源不存在'}
+        if kind == 'UHost' and attrs['State'] != 'Stopped':
+            return {'RetCode': RETCODE_DEPENDENCY, 'Message': '主机未关机'}
+        if any(self._get(region, 'UHost', attrs.get(key)) for key in ATTACH_KEYS if attrs.get(key)):
+            return {'RetCode': RETCODE_DEPENDENCY, 'Message': '资源仍挂载在主机上'}
+        if self.refs.get(resource_id):
+            return {'RetCode': RETCODE_DEPENDENCY, 'Message': '资源仍被其他资源使用'}
+        attrs['Deleting'] = True
+        heapq.heappush(self.pending, (time.monotonic() + self.config.transition, region, kind, resource_id, 'delete'))
+        return {}
+
+# 解析请求参数：URL中的Action，以及表单或JSON格式的请求体
+def parse_request(path, content_type, body):
+    params = dict(parse_qsl(urlparse(path).query))
+    if body:
+        if 'json' in (content_type or ''):
+            params.update(json.loads(body))
+        else:
+            params.update(parse_qsl(body.decode('utf-8')))
+    return params
+
+# HTTP请求处理：POST调用接口，GET /stats 返回调用统计和剩余资源数量
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        params = parse_request(self.path, self.headers.get('Content-Type'), self.rfile.read(length))
+        status, body = self.server.mock.handle(params)
+        self._reply(status, body)
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/stats':
+            self._reply(404, {'Message': 'Not Found'})
+            return
+        mock = self.server.mock
+        self._reply(200, dict(mock.stats(), remaining=mock.remaining()))
+
+    # 客户端测量接入点延迟时发送的探测请求
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _reply(self, status, body):
+        content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+# 在后台线程中启动模拟服务，返回(server, 接口地址)；port为0时自动选择空闲端口
+def start_server(mock, host='127.0.0.1', port=0):
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.mock = mock
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+# 按命令行参数创建模拟服务
+def build_mock(args, regions):
+    config = MockConfig(latency=args.latency, jitter=args.jitter, page_size=args.page_size,
+                        throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                        http_error_rate=args.http_error_rate, transition=args.transition, seed=args.seed)
+    mock = MockUCloud(config)
+    if args.projects:
+        mock.projects = args.projects
+        regions = [mock.scope(project, region) for project in args.projects for region in regions]
+    mock.seed(regions, args.count, None if args.ugns is None else {'UGN': args.ugns}, args.keep)
+    return mock
+
+# 添加模拟服务的命令行参数，供 benchmark.py 复用
+def add_mock_arguments(parser):
+    parser.add_argument('--count', type=int, default=100, help='每个地域每类资源的数量')
+    parser.add_argument('--ugns', type=int, help='每个地域的UGN数量，默认与--count相同')
+    parser.add_argument('--keep', type=int, default=0, help='每个地域每类资源中需要保留（Tag为keep）的数量')
+    parser.add_argument('--latency', type=float, default=0.02, help='每个请求的基础延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.01, help='请求延迟的随机抖动（秒）')
+    parser.add_argument('--page-size', type=int, help='每页最多返回的资源数')
+    parser.add_argument('--throttle-rate', type=int, help='每个接口每秒允许的请求数')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回RetCode错误的概率')
+    parser.add_argument('--http-error-rate', type=float, default=0.0, help='随机返回HTTP 502的概率')
+    parser.add_argument('--transition', type=float, default=0.5, help='关机、删除从发起到生效的时间（秒）')
+    parser.add_argument('--seed', type=int, help='随机数种子')
+    parser.add_argument('--projects', nargs='+', help='模拟的项目，指定后每个项目在每个地域各有一套资源，并可通过 GetProjectList 查询')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地模拟 UCloud API 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--regions', nargs='+', default=['cn-bj2'], help='生成资源的地域')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_server(build_mock(args, args.regions), args.host, args.port)
+    print(f"模拟服务已启动: {url}（设置环境变量 UCLOUD_API_URL={url} 后运行脚本）")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,214 @@
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import ratelimit
+from common import api_url, configure_client, get_common_headers, page_fetcher, list_resources, supports_batch, BATCH_SIZE
+from metrics import METRICS
+from ratelimit import CONCURRENCY
+from resources import RESOURCES, describe_query
+from retry_policy import ApiError
+from filters import ResourceIndex, get_filter
+from records import record_fetcher, record_id
+from main import RESOURCE_GRAPH, DELETE_WORKERS, PLAN_FILE, load_regions
+
+# 删除计划的格式版本，格式变化时递增，避免按旧格式执行
+PLAN_VERSION = 1
+# 同时发出的查询数量
+PLAN_WORKERS = CONCURRENCY
+# 预估时假设每批资源等待关机或删除完成需要的轮询次数
+WAIT_ROUNDS = 3
+# 没有实测请求耗时时使用的默认值（秒）
+DEFAULT_LATENCY = 0.2
+
+# 查询一个地域内某类资源，逐页解析为资源记录；接口支持的过滤条件作为查询参数
+def iter_records(project_id, region, name, headers, rules):
+    spec = RESOURCES[name]
+    query = dict(describe_query(spec, project_id, region), **rules.query_params(spec))
+    fetch_page = record_fetcher(page_fetcher(api_url(spec['describe']), query, headers), name, region)
+    return list_resources(fetch_page, spec['set_key'], record_id, spec['limit'])
+
+# 查询一个地域内某类资源并建立索引
+def index_resources(project_id, region, name, headers, rules):
+    index = ResourceIndex()
+    for record in iter_records(project_id, region, name, headers, rules):
+        index.add(record)
+    return index
+
+# 并发查询所有地域的全部资源，不调用任何删除接口；返回 {地域: {资源类型: [资源ID]}}、
+# 查询失败的资源类型，以及按过滤规则跳过的资源数量。全部查询完成后再按规则选择，
+# UDisk、EIP可以按挂载或绑定的资源所属的VPC判断
+def discover(project_id, regions_data, headers, rules, max_workers=PLAN_WORKERS):
+    found = {region: {} for region in regions_data}
+    errors = {}
+    skipped = {}
+    indexes = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(index_resources, project_id, info['Region'], name, headers, rules): (region, name)
+            for region, info in regions_data.items() for name in RESOURCE_GRAPH
+        }
+        for future in as_completed(futures):
+            region, name = futures[future]
+            try:
+                indexes[(region, name)] = future.result()
+            except ApiError as e:
+                errors.setdefault(region, {})[name] = str(e)
+    for index in indexes.values():
+        for record in index.records.values():
+            rules.remember(record)
+    for (region, name), index in indexes.items():
+        ids = index.select(rules)
+        found[region][name] = ids
+        if len(index) > len(ids):
+            skipped.setdefault(region, {})[name] = len(index) - len(ids)
+    # 按资源类型的固定顺序输出
+    found = {region: {name: resources[name] for name in RESOURCE_GRAPH if name in resources} for region, resources in found.items()}
+    return found, errors, skipped
+
+# 平均每个请求的耗时，用于预估执行时间
+def mean_latency():
+    report = METRICS.report()
+    if not report['calls']:
+        return DEFAULT_LATENCY
+    return report['network_seconds'] / report['calls']
+
+# 预估按计划执行需要的请求次数（不含查询资源列表，执行时直接使用计划中的资源ID）
+def call_budget(resources):
+    budget = {'delete': 0, 'poweroff': 0, 'describe': 0}
+    for name, ids in resources.items():
+        spec = RESOURCES[name]
+        count = len(ids)
+        if not count:
+            continue
+        budget['delete'] += count
+        # 等待删除完成时，支持按ID批量查询的接口每批查询BATCH_SIZE个，否则分页查询全部资源
+        per_round = math.ceil(count / BATCH_SIZE) if supports_batch(spec['describe']) else math.ceil(count / spec['limit'])
+        # 需要先关机的资源还要等待关机完成
+        waits = 2 if spec.get('poweroff') else 1
+        budget['describe'] += per_round * WAIT_ROUNDS * waits
+        if spec.get('poweroff'):
+            budget['poweroff'] += count
+    budget['total'] = sum(budget.values())
+    return budget
+
+# 预估单个地域执行完成的时间：每类资源的耗时受删除线程数和按接口限速约束，
+# 各类资源按依赖关系串行，无依赖关系的资源类型并行
+def region_seconds(resources, latency):
+    finish = {}
+
+    def node_seconds(name):
+        count = len(resources.get(name, []))
+        if not count:
+            return 0
+        spec = RESOURCES[name]
+        rate = DELETE_WORKERS[name] / latency
+        action_rate = ratelimit.ACTION_RATES.get(spec['delete'])
+        if action_rate:
+            rate = min(rate, action_rate)
+        passes = 2 if spec.get('poweroff') else 1
+        return passes * (count / rate + WAIT_ROUNDS * latency)
+
+    def finish_time(name):
+        if name not in finish:
+            _, deps = RESOURCE_GRAPH[name]
+            finish[name] = max((finish_time(dep) for dep in deps), default=0) + node_seconds(name)
+        return finish[name]
+
+    return max((finish_time(name) for name in RESOURCE_GRAPH), default=0)
+
+# 根据各地域查询到的资源ID生成删除计划：数量汇总、请求次数和执行时间预估；extra为附加字段
+def make_plan(project_id, regions_data, found, errors, started, **extra):
+    latency = mean_latency()
+    counts = {name: sum(len(found[region].get(name, [])) for region in found) for name in RESOURCE_GRAPH}
+    budget = {'delete': 0, 'poweroff': 0, 'describe': 0, 'total': 0}
+    seconds = 0
+    for region in found:
+        for key, value in call_budget(found[region]).items():
+            budget[key] += value
+        seconds = max(seconds, region_seconds(found[region], latency))
+    # 所有地域共用全局限速，总请求数按全局速率发送所需的时间是下限
+    if ratelimit.GLOBAL_RATE:
+        seconds = max(seconds, budget['total'] / ratelimit.GLOBAL_RATE)
+
+    return dict({
+        'version': PLAN_VERSION,
+        'project_id': project_id,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'discovery_seconds': round(time.monotonic() - started, 3),
+        'regions': {
+            region: dict(regions_data[region], resources=found[region]) for region in regions_data
+        },
+        'errors': errors,
+        'graph': {name: deps for name, (_, deps) in RESOURCE_GRAPH.items()},
+        'counts': counts,
+        'call_budget': budget,
+        'mean_latency': round(latency, 4),
+        'estimated_seconds': round(seconds, 1),
+    }, **extra)
+
+# 查询所有地域的资源，按过滤规则生成删除计划
+def build_plan(project_id, regions_data, max_workers=PLAN_WORKERS):
+    configure_client(pool_size=CONCURRENCY)
+    started = time.monotonic()
+    rules = get_filter()
+    found, errors, skipped = discover(project_id, regions_data, get_common_headers(), rules, max_workers)
+    return make_plan(project_id, regions_data, found, errors, started, filter=rules.fingerprint(), skipped=skipped)
+
+# 以JSON格式写入删除计划，先写临时文件再替换，避免中断时留下不完整的计划
+def save_plan(plan, path=PLAN_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+# 读取删除计划，文件不存在、格式错误或不属于该项目时返回None
+def load_plan(path, project_id):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except FileNotFoundError:
+        print(f"错误: 删除计划 {path} 未找到")
+        return None
+    except json.JSONDecodeError:
+        print(f"错误: 删除计划 {path} 格式错误")
+        return None
+    if plan.get('version') != PLAN_VERSION:
+        print(f"错误: 删除计划 {path} 的格式版本不匹配，请重新生成")
+        return None
+    if plan.get('project_id') != project_id:
+        print(f"错误: 删除计划 {path} 属于项目 {plan.get('project_id')}，与当前项目 {project_id} 不一致")
+        return None
+    return plan
+
+# 输出删除计划的汇总
+def print_plan(plan):
+    print(f"\n================ 删除计划 ================")
+    for region, info in plan['regions'].items():
+        counts = '，'.join(f"{name}: {len(ids)}" for name, ids in info['resources'].items() if ids)
+        print(f"{region}: {counts or '无'}")
+        skipped = '，'.join(f"{name}: {count}" for name, count in plan.get('skipped', {}).get(region, {}).items())
+        if skipped:
+            print(f"  按过滤规则跳过 {skipped}")
+        for name, error in plan['errors'].get(region, {}).items():
+            print(f"  错误: {name}查询失败，执行时将重新查询: {error}")
+        for ugnid, networks in plan.get('ugn_networks', {}).get(region, {}).items():
+            print(f"  UGN {ugnid}: 解绑 {', '.join(networks)}")
+    budget = plan['call_budget']
+    print(f"预计请求 {budget['total']} 次（删除 {budget['delete']}，关机 {budget['poweroff']}，"
+          f"等待确认 {budget['describe']}），预计耗时 {plan['estimated_seconds']} 秒")
+
+# 查询所有地域的资源并写入删除计划，不删除任何资源
+def run_plan(project_id, path=PLAN_FILE):
+    regions_data = load_regions()
+    if regions_data is None:
+        return None
+    return write_plan(build_plan(project_id, regions_data), path)
+
+# 写入并输出删除计划
+def write_plan(plan, path=PLAN_FILE):
+    save_plan(plan, path)
+    print_plan(plan)
+    print(f"删除计划已写入 {path}，确认后可执行: python3 main.py --apply {path}")
+    return plan
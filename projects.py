@@ -0,0 +1,222 @@
+import argparse
+import contextlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import main
+import ratelimit
+import ugn_clean
+from common import api_url, configure_client, post_request
+from filters import FilterRules, configure_filter, load_filter
+from metrics import METRICS, REPORT_FILE as PROJECT_REPORT_FILE
+from ratelimit import RateLimiter, CONCURRENCY, MIN_CONCURRENCY
+from retry_policy import ApiError, describe_failure, succeeded
+
+# 多项目运行：每个项目在进程池中的独立进程内执行 main.main（可选先执行 ugn_clean.main），
+# 各进程平分全局限速和并发预算，单个项目失败不影响其他项目，结束后合并为一份报告
+
+# 项目列表的默认配置文件（JSON数组）
+PROJECTS_FILE = 'projects.json'
+# 合并报告的默认输出文件
+REPORT_FILE = 'projects_report.json'
+# 各项目的断点日志、空资源类型缓存、运行日志和报告所在的目录
+RUNS_DIR = 'runs'
+# 同时运行的项目数量（进程数）
+PROCESSES = 4
+
+# 从配置文件读取项目列表，失败时返回None
+def load_projects(path=PROJECTS_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            projects = json.load(f)
+    except FileNotFoundError:
+        print(f"错误: 项目列表 {path} 未找到")
+        return None
+    except json.JSONDecodeError:
+        print(f"错误: 项目列表 {path} 格式错误")
+        return None
+    if not isinstance(projects, list):
+        print(f"错误: 项目列表 {path} 应为项目ID数组")
+        return None
+    return projects
+
+# 查询账号下的全部项目
+def discover_projects():
+    configure_client()
+    data = post_request(api_url('GetProjectList'), {'Action': 'GetProjectList', '_timestamp': int(time.time() * 1000)})
+    if not succeeded(data):
+        raise ApiError(f"查询项目列表失败: {describe_failure(data)}")
+    return [project['ProjectId'] for project in data.get('ProjectSet', [])]
+
+# 按进程数平分全局预算：每个进程的全局、按接口、按地域速率和并发上限为总预算的1/processes，
+# 所有进程合计不超过总预算
+def share_budget(processes, rate=None, concurrency=None):
+    rate = ratelimit.GLOBAL_RATE if rate is None else rate
+    concurrency = concurrency or CONCURRENCY
+    return {
+        'global_rate': rate / processes if rate else 0,
+        'action_rates': {action: value / processes for action, value in ratelimit.ACTION_RATES.items()},
+        'region_rates': {region: value / processes for region, value in ratelimit.REGION_RATES.items()},
+        'concurrency': max(MIN_CONCURRENCY, concurrency // processes),
+    }
+
+# 在子进程中清理单个项目，输出写入该项目目录下的 sweep.log，返回结果和运行指标；
+# 任何异常只记为该项目失败
+def run_project(project_id, options):
+    state_dir = os.path.join(options['runs_dir'], project_id)
+    os.makedirs(state_dir, exist_ok=True)
+    configure_filter(options['rules'])
+    METRICS.reset()
+    started = time.monotonic()
+    result = {'project_id': project_id, 'pid': os.getpid(), 'status': 'ok', 'regions': {}}
+    with open(os.path.join(state_dir, 'sweep.log'), 'w', encoding='utf-8') as log_file, contextlib.redirect_stdout(log_file):
+        try:
+            limiter = RateLimiter(**options['budget'])
+            if options['ugn']:
+                targets = ugn_clean.load_targets()
+                if targets is None:
+                    raise RuntimeError("读取 region.json 失败")
+                configure_client(pool_size=CONCURRENCY, limiter=limiter)
+                ugn_clean.main(project_id, targets)
+            regions = main.main(project_id, options['max_workers'], options['resume'], options['refresh'],
+                                state_dir=state_dir, limiter=limiter)
+            if regions is None:
+                raise RuntimeError("读取 region.json 失败")
+            result['regions'] = regions
+            if any(region['errors'] for region in regions.values()):
+                result['status'] = 'partial'
+        except Exception as e:
+            print(traceback.format_exc())
+            result.update(status='failed', error=str(e))
+    result['wall_seconds'] = round(time.monotonic() - started, 3)
+    result['metrics'] = METRICS.report()
+    METRICS.write_report(os.path.join(state_dir, PROJECT_REPORT_FILE))
+    return result
+
+# 合并各项目的结果：删除数量按资源类型汇总，请求次数、失败和重试次数按接口汇总
+def merge_results(results):
+    deleted = {}
+    actions = {}
+    for result in results.values():
+        for region in result.get('regions', {}).values():
+            for name, count in region['counts'].items():
+                deleted[name] = deleted.get(name, 0) + count
+        for action, stats in result.get('metrics', {}).get('actions', {}).items():
+            merged = actions.setdefault(action, {'calls': 0, 'errors': 0, 'retries': 0, 'network_seconds': 0.0})
+            for key in merged:
+                merged[key] += stats[key]
+    for stats in actions.values():
+        stats['network_seconds'] = round(stats['network_seconds'], 3)
+    statuses = [result['status'] for result in results.values()]
+    return {
+        'projects': len(results),
+        'succeeded': statuses.count('ok'),
+        'partial': statuses.count('partial'),
+        'failed': statuses.count('failed'),
+        'deleted': {name: deleted[name] for name in main.RESOURCE_GRAPH if name in deleted},
+        'calls': sum(stats['calls'] for stats in actions.values()),
+        'errors': sum(stats['errors'] for stats in actions.values()),
+        'retries': sum(stats['retries'] for stats in actions.values()),
+        'actions': actions,
+    }
+
+# 在进程池中并发清理多个项目，返回合并报告；未指定过滤规则时删除查询到的全部资源
+def run_projects(projects, processes=PROCESSES, rate=None, concurrency=None, ugn=False,
+                 resume=False, refresh=False, rules=None, runs_dir=RUNS_DIR, max_workers=main.MAX_WORKERS):
+    processes = max(1, min(processes, len(projects)))
+    options = {
+        'budget': share_budget(processes, rate, concurrency),
+        'runs_dir': runs_dir,
+        'rules': FilterRules() if rules is None else rules,
+        'ugn': ugn,
+        'resume': resume,
+        'refresh': refresh,
+        'max_workers': max_workers,
+    }
+    started = time.monotonic()
+    results = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {executor.submit(run_project, project_id, options): project_id for project_id in projects}
+        for future in as_completed(futures):
+            project_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # 子进程异常退出等无法返回结果的情况
+                result = {'project_id': project_id, 'status': 'failed', 'error': str(e) or type(e).__name__, 'regions': {}}
+            results[project_id] = result
+            print_project(result)
+    return {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'wall_seconds': round(time.monotonic() - started, 3),
+        'processes': processes,
+        'budget': options['budget'],
+        'summary': merge_results(results),
+        'results': {project_id: results[project_id] for project_id in projects},
+    }
+
+# 输出单个项目的结果
+def print_project(result):
+    deleted = sum(sum(region['counts'].values()) for region in result['regions'].values())
+    line = f"项目 {result['project_id']}: {result['status']}，删除 {deleted} 个资源"
+    if 'wall_seconds' in result:
+        line += f"，请求 {result['metrics']['calls']} 次，耗时 {result['wall_seconds']}s"
+    print(line)
+    if result.get('error'):
+        print(f"  错误: {result['error']}")
+    for region, info in result['regions'].items():
+        for error in info['errors']:
+            print(f"  {region} 错误: {error}")
+
+# 输出合并报告的汇总
+def print_report(report):
+    summary = report['summary']
+    print(f"\n================ 多项目删除汇总 ================")
+    print(f"项目 {summary['projects']} 个：成功 {summary['succeeded']}，部分失败 {summary['partial']}，失败 {summary['failed']}")
+    counts = '，'.join(f"{name}: {count}" for name, count in summary['deleted'].items())
+    print(f"删除资源: {counts or '无'}")
+    print(f"共发送请求 {summary['calls']} 次（失败 {summary['errors']}，重试 {summary['retries']}），"
+          f"{report['processes']} 个进程，耗时 {report['wall_seconds']}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='在进程池中并发清理多个项目的资源，并合并运行报告')
+    parser.add_argument('projects', nargs='*', help=f'项目ID，未指定时读取 {PROJECTS_FILE}')
+    parser.add_argument('--file', help='项目列表（JSON数组）文件')
+    parser.add_argument('--discover', action='store_true', help='通过 GetProjectList 查询账号下的全部项目')
+    parser.add_argument('--processes', type=int, default=PROCESSES, help='同时清理的项目数量，默认 %(default)s')
+    parser.add_argument('--rate', type=float, help=f'所有项目合计的每秒请求数，默认 {ratelimit.GLOBAL_RATE}')
+    parser.add_argument('--concurrency', type=int, help=f'所有项目合计的在途请求数，默认 {CONCURRENCY}')
+    parser.add_argument('--ugn', action='store_true', help='删除资源前先解绑并删除各项目的UGN')
+    parser.add_argument('--resume', action='store_true', help='从各项目的断点日志继续')
+    parser.add_argument('--refresh', action='store_true', help='忽略空资源类型缓存')
+    parser.add_argument('--filter', metavar='FILE', help='资源过滤规则（JSON），用法与 main.py 相同')
+    parser.add_argument('--runs-dir', default=RUNS_DIR, help='各项目的日志和报告目录，默认 %(default)s')
+    parser.add_argument('--report', default=REPORT_FILE, help='合并报告（JSON）的输出文件，默认 %(default)s')
+    args = parser.parse_args()
+
+    if args.discover:
+        try:
+            projects = discover_projects()
+        except ApiError as e:
+            print(f"错误: {e}")
+            raise SystemExit(1)
+    elif args.projects:
+        projects = args.projects
+    else:
+        projects = load_projects(args.file or PROJECTS_FILE)
+    if not projects:
+        print("错误: 没有需要清理的项目")
+        raise SystemExit(1)
+    rules = load_filter(args.filter)
+    if rules is None:
+        raise SystemExit(1)
+
+    report = run_projects(projects, args.processes, args.rate, args.concurrency, args.ugn,
+                          args.resume, args.refresh, rules, args.runs_dir)
+    print_report(report)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"合并报告已写入 {args.report}，各项目的日志见 {args.runs_dir}/<项目ID>/sweep.log")
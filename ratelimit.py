@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from metrics import METRICS
+
+# 全局每秒请求数上限
+GLOBAL_RATE = 50
+# 按接口(Action)设置的每秒请求数上限，未设置的接口只受全局限制
+ACTION_RATES = {
+    'PoweroffUHostInstance': 10,
+    'TerminateUHostInstance': 10,
+}
+# 按地域设置的每秒请求数上限，未设置的地域只受全局限制
+REGION_RATES = {}
+# 同时在途请求数的初始值和上下限，遇到限流时自适应调整
+CONCURRENCY = 32
+MIN_CONCURRENCY = 2
+# 视为限流的RetCode（172：请求过于频繁），以及返回信息中表示限流的关键字
+THROTTLE_RETCODES = {172}
+THROTTLE_KEYWORDS = ('频繁', 'too frequent', 'too many', 'rate limit', 'throttl')
+
+# 令牌桶：按rate匀速补充令牌，最多积累burst个，取不到令牌时阻塞等待
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # 尝试获取一个令牌，成功时返回0，否则返回需要等待的秒数
+    def _take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    # 获取一个令牌，返回等待的秒数
+    def acquire(self):
+        waited = 0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    # acquire的协程版本
+    async def acquire_async(self):
+        waited = 0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+# 并发控制：按AIMD调整在途请求上限，正常响应时缓慢增加，遇到限流时减半
+class AdaptiveConcurrency:
+    def __init__(self, initial, minimum=MIN_CONCURRENCY, maximum=None):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum or initial
+        self.active = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.active >= int(self.limit):
+                self.cond.wait()
+            self.active += 1
+
+    # acquire的协程版本：不阻塞事件循环，名额已满时短暂等待后重试
+    async def acquire_async(self):
+        while True:
+            with self.cond:
+                if self.active < int(self.limit):
+                    self.active += 1
+                    return
+            await asyncio.sleep(0.01)
+
+    def release(self, throttled):
+        with self.cond:
+            self.active -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                # 每个窗口（约limit个请求）增加1
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+
+# 请求限流器：依次经过全局、接口、地域三级令牌桶，再受自适应并发上限约束
+class RateLimiter:
+    # 未传入的参数使用模块中的默认配置
+    def __init__(self, global_rate=None, action_rates=None, region_rates=None, concurrency=None):
+        global_rate = GLOBAL_RATE if global_rate is None else global_rate
+        self.global_bucket = TokenBucket(global_rate) if global_rate else None
+        self.action_rates = ACTION_RATES if action_rates is None else action_rates
+        self.region_rates = REGION_RATES if region_rates is None else region_rates
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.concurrency = AdaptiveConcurrency(concurrency or CONCURRENCY)
+
+    def _bucket(self, key, rate):
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(rate)
+            return self.buckets[key]
+
+    # 记录令牌桶等待和并发名额等待的时间
+    def _record_wait(self, rate_wait, concurrency_wait):
+        if rate_wait:
+            METRICS.record_sleep('rate_limit', rate_wait)
+        if concurrency_wait >= 0.001:
+            METRICS.record_sleep('concurrency', concurrency_wait)
+
+    # 获取发送请求的许可；调用方通过yield返回的函数报告本次请求是否被限流
+    @contextmanager
+    def limit(self, action=None, region=None):
+        waited = 0
+        if self.global_bucket is not None:
+            waited += self.global_bucket.acquire()
+        if action in self.action_rates:
+            waited += self._bucket(('action', action), self.action_rates[action]).acquire()
+        if region in self.region_rates:
+            waited += self._bucket(('region', region), self.region_rates[region]).acquire()
+        started = time.monotonic()
+        self.concurrency.acquire()
+        self._record_wait(waited, time.monotonic() - started)
+        state = {'throttled': False}
+
+        def report(throttled):
+            state['throttled'] = throttled
+
+        try:
+            yield report
+        except Exception:
+            state['throttled'] = True
+            raise
+        finally:
+            self.concurrency.release(state['throttled'])
+
+    # limit的协程版本，与同步请求共用同一套令牌桶和并发上限
+    @asynccontextmanager
+    async def limit_async(self, action=None, region=None):
+        waited = 0
+        if self.global_bucket is not None:
+            waited += await self.global_bucket.acquire_async()
+        if action in self.action_rates:
+            waited += await self._bucket(('action', action), self.action_rates[action]).acquire_async()
+        if region in self.region_rates:
+            waited += await self._bucket(('region', region), self.region_rates[region]).acquire_async()
+        started = time.monotonic()
+        await self.concurrency.acquire_async()
+        self._record_wait(waited, time.monotonic() - started)
+        state = {'throttled': False}
+
+        def report(throttled):
+            state['throttled'] = throttled
+
+        try:
+            yield report
+        except Exception:
+            state['throttled'] = True
+            raise
+        finally:
+            self.concurrency.release(state['throttled'])
+
+# 根据HTTP状态码和响应内容判断请求是否被限流或服务端过载
+def is_throttled(status_code, body):
+    if status_code == 429 or status_code >= 500:
+        return True
+    if not isinstance(body, dict) or body.get('RetCode', 0) == 0:
+        return False
+    if body['RetCode'] in THROTTLE_RETCODES:
+        return True
+    message = str(body.get('Message', '')).lower()
+    return any(keyword in message for keyword in THROTTLE_KEYWORDS)
@@ -0,0 +1,193 @@
+import argparse
+import gzip
+import json
+import re
+import threading
+import time
+from collections import deque
+
+# 请求录制与回放：录制模式下把每个请求的参数、响应和耗时逐行写入gzip压缩的JSONL文件；
+# 回放模式在本地启动HTTP服务，按录制的响应和耗时（可按比例缩放）应答，不访问网络即可复现生产环境的请求负载
+
+# 录制文件的默认路径
+RECORD_FILE = 'recording.jsonl.gz'
+# 不参与录制和匹配的参数（每次请求都不同）
+IGNORED_PARAMS = ('_timestamp',)
+# 回放时请求未被录制过返回的错误码
+RETCODE_NOT_RECORDED = 160
+# 数组参数（如 UHostIds.0、Networks[0]）的参数名
+ARRAY_PARAM = re.compile(r'^(.+?)(?:\.\d+|\[\d+\])$')
+
+# 去掉不参与录制和匹配的参数
+def clean_params(params):
+    return {key: value for key, value in params.items() if key not in IGNORED_PARAMS}
+
+# 回放时匹配请求的键：参数按名称排序，值统一转为字符串（表单和JSON请求的值类型不同）；
+# 数组参数按集合比较，不受元素顺序影响
+def request_key(params):
+    scalars = []
+    arrays = {}
+    for key, value in clean_params(params).items():
+        match = ARRAY_PARAM.match(key)
+        if match:
+            arrays.setdefault(match.group(1), []).append(str(value))
+        else:
+            scalars.append((key, str(value)))
+    scalars.extend((key, sorted(values)) for key, values in arrays.items())
+    return json.dumps(sorted(scalars), ensure_ascii=False)
+
+# 录制器：多个线程共用，逐行压缩写入，不在内存中积累
+class Recorder:
+    def __init__(self, path=RECORD_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self.started = time.monotonic()
+        self.count = 0
+
+    # 记录一次请求；body为解析后的JSON，无法解析时为响应文本；请求未得到响应时记录error
+    def record(self, params, status, body, seconds, error=None):
+        entry = {
+            't': round(time.monotonic() - self.started, 4),
+            'params': clean_params(params),
+            'status': status,
+            'latency': round(seconds, 4),
+            'body': body,
+        }
+        if error is not None:
+            entry['error'] = error
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+# 当前的录制器，未开启录制时为None
+_recorder = None
+
+def get_recorder():
+    return _recorder
+
+# 开启录制
+def start_recording(path=RECORD_FILE):
+    global _recorder
+    _recorder = Recorder(path)
+    return _recorder
+
+# 结束录制，返回录制的请求数
+def stop_recording():
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is None:
+        return 0
+    recorder.close()
+    print(f"已录制 {recorder.count} 个请求到 {recorder.path}")
+    return recorder.count
+
+# 逐行读取录制文件；程序中断时最后一行可能不完整，直接忽略
+def read_recording(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+        except EOFError:
+            pass
+
+# 回放数据：相同请求的多个响应按录制顺序依次返回（如轮询时资源状态的变化），用完后重复最后一个；
+# scale为耗时的缩放比例，0表示立即返回
+class ReplayStore:
+    def __init__(self, path, scale=1.0):
+        self.scale = scale
+        self.lock = threading.Lock()
+        self.responses = {}
+        self.calls = {}
+        self.served = 0
+        self.missed = 0
+        for entry in read_recording(path):
+            self.responses.setdefault(request_key(entry['params']), deque()).append(entry)
+
+    # 处理一次请求，返回(HTTP状态码, 响应内容)，与 mock_server.MockUCloud.handle 的接口一致
+    def handle(self, params):
+        action = params.get('Action')
+        with self.lock:
+            self.calls[action] = self.calls.get(action, 0) + 1
+            queue = self.responses.get(request_key(params))
+            if not queue:
+                self.missed += 1
+                entry = None
+            else:
+                self.served += 1
+                entry = queue.popleft() if len(queue) > 1 else queue[0]
+        if entry is None:
+            return 200, {'RetCode': RETCODE_NOT_RECORDED, 'Message': f'未录制的请求: {action}', 'Action': action}
+        if self.scale:
+            time.sleep(entry['latency'] * self.scale)
+        if entry.get('error') is not None:
+            # 录制时请求未得到响应（超时、连接失败），回放为网关错误，由客户端按可重试错误处理
+            return 504, {'Message': entry['error']}
+        return entry['status'], entry['body']
+
+    def stats(self):
+        with self.lock:
+            return {
+                'calls': sum(self.calls.values()),
+                'actions': dict(self.calls),
+                'served': self.served,
+                'missed': self.missed,
+                'throttled': 0,
+                'errors': 0,
+            }
+
+    # 尚未回放的响应数量
+    def remaining(self):
+        with self.lock:
+            return {'unplayed': sum(len(queue) - 1 for queue in self.responses.values())}
+
+# 汇总录制文件：按接口统计请求次数、失败次数和耗时
+def summarize(path):
+    actions = {}
+    count = 0
+    duration = 0.0
+    for entry in read_recording(path):
+        count += 1
+        duration = max(duration, entry['t'] + entry['latency'])
+        stats = actions.setdefault(entry['params'].get('Action'), {'calls': 0, 'errors': 0, 'seconds': 0.0})
+        stats['calls'] += 1
+        stats['seconds'] += entry['latency']
+        body = entry['body']
+        if entry.get('error') is not None or not isinstance(body, dict) or body.get('RetCode', 0) != 0:
+            stats['errors'] += 1
+    print(f"{path}: 共 {count} 个请求，录制时长 {duration:.3f}s")
+    for action, stats in sorted(actions.items(), key=lambda item: -item[1]['calls']):
+        mean = stats['seconds'] / stats['calls']
+        print(f"  {action}: {stats['calls']} 次，失败 {stats['errors']} 次，平均耗时 {mean:.4f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='回放或汇总 main.py / ugn_clean.py 通过 --record 录制的请求')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    replay = subparsers.add_parser('replay', help='在本地启动回放服务')
+    replay.add_argument('path', nargs='?', default=RECORD_FILE)
+    replay.add_argument('--host', default='127.0.0.1')
+    replay.add_argument('--port', type=int, default=8080)
+    replay.add_argument('--scale', type=float, default=1.0, help='耗时的缩放比例，1为录制时的耗时，0为立即返回')
+    summary = subparsers.add_parser('summary', help='按接口汇总录制的请求')
+    summary.add_argument('path', nargs='?', default=RECORD_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        summarize(args.path)
+    else:
+        from mock_server import start_server
+        store = ReplayStore(args.path, args.scale)
+        server, url = start_server(store, args.host, args.port)
+        print(f"回放服务已启动: {url}（设置环境变量 UCLOUD_API_URL={url} 后运行脚本）")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,139 @@
+from resources import RESOURCES
+
+# 资源记录：查询到的每一页在收到后立即解析为只包含调度和过滤所需字段的紧凑记录，原始响应随即丢弃，
+# 资源数量很多时内存占用只与记录数成正比；ResourceStore 按所属VPC、子网和挂载的资源建立索引，依赖关系按字典查找
+
+# 各类资源表示名称的字段
+NAME_KEYS = ('Name', 'NATGWName', 'SubnetName')
+# 各类资源表示状态的字段：UHost为State，UDisk、EIP等为Status
+STATE_KEYS = ('State', 'Status')
+
+# 单个资源的记录，parent为资源挂载或绑定的资源ID（UDisk挂载的UHost，EIP、虚拟网卡绑定的资源）
+class Resource:
+    __slots__ = ('id', 'type', 'region', 'state', 'vpc', 'subnet', 'parent', 'tag', 'name', 'created')
+
+    def __init__(self, id, type, region, state=None, vpc=None, subnet=None, parent=None, tag=None, name=None, created=None):
+        self.id = id
+        self.type = type
+        self.region = region
+        self.state = state
+        self.vpc = vpc
+        self.subnet = subnet
+        self.parent = parent
+        self.tag = tag
+        self.name = name
+        self.created = created
+
+    def __repr__(self):
+        return f"Resource({self.type} {self.id} @ {self.region})"
+
+# 取第一个存在的字段值
+def first_value(item, keys):
+    for key in keys:
+        if item.get(key) is not None:
+            return item[key]
+    return None
+
+# 资源所属的VPC或子网：VPC本身、子网、网卡等直接返回，UHost在IPSet中返回；EIP、UDisk等不属于VPC时返回None
+def network_value(item, key):
+    if item.get(key):
+        return item[key]
+    for ip in item.get('IPSet') or []:
+        if ip.get(key):
+            return ip[key]
+    return None
+
+# 资源挂载或绑定的资源ID：UDisk返回UHostId，EIP在Resource中返回，虚拟网卡返回AttachInstanceId；
+# id_key为资源自身的ID字段，不作为挂载的资源（UHost自身带有UHostId）
+def resource_parent(item, id_key):
+    if id_key != 'UHostId' and item.get('UHostId'):
+        return item['UHostId']
+    resource = item.get('Resource')
+    if isinstance(resource, dict):
+        return resource.get('ResourceId')
+    return item.get('ResourceId') or item.get('AttachInstanceId')
+
+# 把查询结果中的一项解析为资源记录；VPC的所属VPC为其自身（按VPC过滤时包含VPC本身），子网不记录所属子网
+def parse_resource(name, region, item):
+    id_key = RESOURCES[name]['id_key']
+    return Resource(
+        item[id_key], name, region,
+        state=first_value(item, STATE_KEYS),
+        vpc=network_value(item, 'VPCId'),
+        subnet=network_value(item, 'SubnetId') if id_key != 'SubnetId' else None,
+        parent=resource_parent(item, id_key),
+        tag=item.get('Tag'),
+        name=first_value(item, NAME_KEYS),
+        created=item.get('CreateTime'),
+    )
+
+# 把一页查询结果中的资源列表替换为资源记录，只保留分页需要的TotalCount；查询失败的响应原样返回
+def parse_response(response, name, region):
+    set_key = RESOURCES[name]['set_key']
+    if response is None or set_key not in response:
+        return response
+    return {'TotalCount': response.get('TotalCount'),
+            set_key: [parse_resource(name, region, item) for item in response[set_key] or []]}
+
+# 包装分页查询函数，每页在查询线程中收到后立即解析
+def record_fetcher(fetch_page, name, region):
+    def fetch(offset, limit):
+        return parse_response(fetch_page(offset, limit), name, region)
+    return fetch
+
+# 资源记录的ID，用作 list_resources 的去重键
+def record_id(record):
+    return record.id
+
+# 资源记录的集合：按ID、资源类型、所属VPC、子网和挂载的资源建立索引，索引值为按加入顺序排列的ID
+class ResourceStore:
+    def __init__(self):
+        self.records = {}
+        self.by_type = {}
+        self.by_vpc = {}
+        self.by_subnet = {}
+        self.by_parent = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        self.discard(record.id)
+        self.records[record.id] = record
+        for index, key in self._indexes(record):
+            index.setdefault(key, {})[record.id] = None
+
+    def discard(self, resource_id):
+        record = self.records.pop(resource_id, None)
+        if record is None:
+            return
+        for index, key in self._indexes(record):
+            ids = index[key]
+            del ids[record.id]
+            if not ids:
+                del index[key]
+
+    def _indexes(self, record):
+        indexes = [(self.by_type, record.type)]
+        for index, key in ((self.by_vpc, record.vpc), (self.by_subnet, record.subnet), (self.by_parent, record.parent)):
+            if key is not None:
+                indexes.append((index, key))
+        return indexes
+
+    # 按索引查找：keys中任一值对应的资源ID，可只取某类资源
+    def _find(self, index, keys, kind=None):
+        found = {}
+        for key in keys:
+            found.update(index.get(key, {}))
+        if kind is None:
+            return list(found)
+        return [resource_id for resource_id in found if self.records[resource_id].type == kind]
+
+    def in_vpcs(self, vpcs, kind=None):
+        return self._find(self.by_vpc, vpcs, kind)
+
+    def in_subnets(self, subnets, kind=None):
+        return self._find(self.by_subnet, subnets, kind)
+
+    def attached_to(self, owners, kind=None):
+        return self._find(self.by_parent, owners, kind)
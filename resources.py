@@ -0,0 +1,82 @@
+# 资源类型注册表：每类资源的查询、删除接口及参数，main.py 和 async_sweep.py 按注册表统一执行查询、删除和等待，
+# 新增资源类型只需在此添加一项。各字段含义：
+#   describe / describe_params / set_key / id_key / limit: 查询接口、附加参数、响应中的列表字段、ID字段、每页数量
+#   filter_params: 查询接口支持的过滤参数（过滤条件 -> 参数名），见 filters.py
+#   delete / delete_params / zone: 删除接口、附加参数、删除时是否需要传入可用区
+#   poweroff: 删除前需要先执行的操作及需要等待进入的状态（如UHost需先关机）
+#   workers: 单个地域内并发删除的线程数
+#   depends: 需要先删除完成的资源类型。UHost删除后才能删除其挂载的UDisk、绑定的EIP和虚拟网卡；
+#            绑定在ALB、NAT网关上的EIP需等待其释放；子网内的资源清空后才能删除子网，子网删除后才能删除VPC
+#   label: 日志中显示的名称，默认与资源类型相同
+RESOURCES = {
+    'UHost': {
+        'describe': 'DescribeUHostInstance', 'describe_params': {},
+        'set_key': 'UHostSet', 'id_key': 'UHostId', 'limit': 2000,
+        'filter_params': {'tags': 'Tag', 'vpc_ids': 'VPCId'},
+        'delete': 'TerminateUHostInstance', 'delete_params': {},
+        'poweroff': {'action': 'PoweroffUHostInstance', 'state': 'Stopped'},
+        'workers': 4, 'depends': [],
+    },
+    'UDisk': {
+        'describe': 'DescribeUDisk', 'describe_params': {'HostProduct': 'uhost'},
+        'set_key': 'DataSet', 'id_key': 'UDiskId', 'limit': 2000,
+        'delete': 'DeleteUDisk', 'delete_params': {'DeleteSnapshotService': 'No'}, 'zone': True,
+        'workers': 4, 'depends': ['UHost'],
+    },
+    'EIP': {
+        'describe': 'DescribeEIPWithAllNum', 'describe_params': {'HostProduct': 'uhost'},
+        'set_key': 'EIPSet', 'id_key': 'EIPId', 'limit': 2000,
+        'delete': 'ReleaseEIP', 'delete_params': {'ApiVersion': 3}, 'zone': True,
+        'workers': 4, 'depends': ['UHost', 'ALB', 'NATGW'],
+    },
+    'ALB': {
+        'describe': 'DescribeLoadBalancers', 'describe_params': {},
+        'set_key': 'LoadBalancers', 'id_key': 'LoadBalancerId', 'limit': 100,
+        'filter_params': {'vpc_ids': 'VPCId'},
+        'delete': 'DeleteLoadBalancer', 'delete_params': {}, 'zone': True,
+        'workers': 2, 'depends': [],
+    },
+    'NATGW': {
+        'describe': 'DescribeNATGW', 'describe_params': {},
+        'set_key': 'DataSet', 'id_key': 'NATGWId', 'limit': 100,
+        'delete': 'DeleteNATGW', 'delete_params': {'ReleaseEip': 'true'}, 'zone': True,
+        'workers': 2, 'depends': [], 'label': 'NAT网关',
+    },
+    '虚拟网卡': {
+        'describe': 'DescribeNetworkInterface', 'describe_params': {},
+        'set_key': 'NetworkInterfaceSet', 'id_key': 'InterfaceId', 'limit': 100,
+        'filter_params': {'vpc_ids': 'VPCId'},
+        'delete': 'DeleteNetworkInterface', 'delete_params': {}, 'zone': True,
+        'workers': 4, 'depends': ['UHost'],
+    },
+    '子网': {
+        'describe': 'DescribeSubnet', 'describe_params': {'ShowAvailableIPs': True, 'IgnoreResource': True},
+        'set_key': 'DataSet', 'id_key': 'SubnetId', 'limit': 2000,
+        'filter_params': {'tags': 'Tag', 'vpc_ids': 'VPCId'},
+        'delete': 'DeleteSubnet', 'delete_params': {}, 'zone': True,
+        'workers': 2, 'depends': ['UHost', 'ALB', 'NATGW', '虚拟网卡'],
+    },
+    'VPC': {
+        'describe': 'DescribeVPC', 'describe_params': {},
+        'set_key': 'DataSet', 'id_key': 'VPCId', 'limit': 2000,
+        'filter_params': {'tags': 'Tag'},
+        'delete': 'DeleteVPC', 'delete_params': {},
+        'workers': 2, 'depends': ['子网'],
+    },
+}
+
+# 构造资源的查询参数
+def describe_query(spec, project_id, region):
+    return dict(spec['describe_params'], ProjectId=project_id, Region=region,
+                Limit=spec['limit'], Offset=0, Action=spec['describe'])
+
+# 日志中显示的资源名称
+def resource_label(name):
+    return RESOURCES[name].get('label', name)
+
+# 构造删除或其他操作（如关机）的参数
+def action_params(spec, action, params, project_id, region, zone, resource_id):
+    data = dict(params, ProjectId=project_id, Region=region, Action=action, **{spec['id_key']: resource_id})
+    if spec.get('zone'):
+        data['Zone'] = zone
+    return data
@@ -0,0 +1,73 @@
+from ratelimit import is_throttled
+
+# 请求结果分类：成功、可重试（限流、服务端错误、网络异常）、依赖资源尚未就绪、资源已不存在、不可重试
+OK = 'ok'
+RETRYABLE = 'retryable'
+DEPENDENCY = 'dependency'
+GONE = 'gone'
+FATAL = 'fatal'
+
+# 建立连接和等待响应的超时时间（秒），连接失败时尽快重试，不必等满读取超时
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+# 可重试错误的最多请求次数，以及重试间隔的初始值和上限（秒）
+MAX_ATTEMPTS = 6
+RETRY_INTERVAL = 0.5
+RETRY_MAX_INTERVAL = 8
+# 依赖资源尚未就绪（如子网内的主机仍在删除中）时持续重试的最长时间（秒）
+DEPENDENCY_TIMEOUT = 30
+
+# 按RetCode分类（与 mock_server.py 返回的错误码一致）：160 接口不存在，5000 服务内部错误，
+# 8046 资源仍被其他资源使用或未关机，8039 资源不存在；限流的RetCode见 ratelimit.THROTTLE_RETCODES
+RETRYABLE_RETCODES = {5000}
+DEPENDENCY_RETCODES = {8046}
+GONE_RETCODES = {8039}
+FATAL_RETCODES = {160}
+# 未登记的RetCode按返回信息中的关键字分类，只用于判断可重试和依赖未就绪；
+# 资源已不存在只按RetCode判断，避免把“项目不存在”等错误当作删除成功
+RETRYABLE_KEYWORDS = ('内部错误', '请稍后', 'internal error', 'try again later', 'service unavailable')
+DEPENDENCY_KEYWORDS = ('未关机', '仍挂载', '仍绑定', '仍被', '使用中', 'in use', 'not stopped')
+
+# 接口调用失败，如资源列表查询失败
+class ApiError(Exception):
+    pass
+
+# 根据HTTP状态码和响应内容对请求结果分类
+def classify(status_code, body):
+    if is_throttled(status_code, body):
+        return RETRYABLE
+    if status_code >= 400:
+        return FATAL
+    if not isinstance(body, dict):
+        # 响应不是JSON，通常是网关返回的错误页面
+        return RETRYABLE
+    retcode = body.get('RetCode', 0)
+    if retcode == 0:
+        return OK
+    for category, retcodes in ((FATAL, FATAL_RETCODES), (RETRYABLE, RETRYABLE_RETCODES),
+                               (DEPENDENCY, DEPENDENCY_RETCODES), (GONE, GONE_RETCODES)):
+        if retcode in retcodes:
+            return category
+    message = str(body.get('Message', '')).lower()
+    for category, keywords in ((DEPENDENCY, DEPENDENCY_KEYWORDS), (RETRYABLE, RETRYABLE_KEYWORDS)):
+        if any(keyword in message for keyword in keywords):
+            return category
+    return FATAL
+
+# 判断是否应当再次请求：可重试错误不超过最多请求次数，依赖未就绪不超过最长等待时间
+def should_retry(category, attempt, waited):
+    if category == RETRYABLE:
+        return attempt < MAX_ATTEMPTS
+    if category == DEPENDENCY:
+        return waited < DEPENDENCY_TIMEOUT
+    return False
+
+# 判断接口调用是否成功；删除时资源已不存在同样视为成功
+def succeeded(response):
+    return isinstance(response, dict) and classify(200, response) in (OK, GONE)
+
+# 描述失败的响应，用于日志和异常信息
+def describe_failure(response):
+    if not isinstance(response, dict):
+        return "请求失败"
+    return f"RetCode {response.get('RetCode')}: {response.get('Message', '')}"
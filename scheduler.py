@@ -0,0 +1,80 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from common import log, get_log_buffer, set_log_buffer
+
+# 按依赖关系并发执行任务
+# graph 为 {节点: [依赖节点, ...]}，节点的所有依赖执行完成后立即提交到线程池，
+# 不需要等待整批任务结束；run(node) 的返回值按节点收集后返回
+def run_graph(graph, run, max_workers, on_done=None):
+    for node, deps in graph.items():
+        for dep in deps:
+            if dep not in graph:
+                raise ValueError(f"节点 {node} 依赖的 {dep} 不存在")
+
+    pending = {node: set(deps) for node, deps in graph.items()}
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+
+        # 提交所有依赖已满足的节点
+        def submit_ready():
+            ready = [node for node, deps in pending.items() if not deps]
+            for node in ready:
+                del pending[node]
+                running[executor.submit(run, node)] = node
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                results[node] = future.result()
+                for deps in pending.values():
+                    deps.discard(node)
+                if on_done is not None:
+                    on_done(node, results[node])
+            submit_ready()
+
+    if pending:
+        raise ValueError(f"依赖关系存在环: {', '.join(str(node) for node in pending)}")
+    return results
+
+# 生产者/消费者流水线：从items中逐个取出元素放入有界队列，由workers个线程并发调用handle处理。
+# 队列满时生产者阻塞，未处理的元素数量不超过队列长度，items可以是边查询边返回的生成器。
+# 返回(handle返回真值的元素列表, 元素总数)
+def run_pipeline(items, handle, workers=4, queue_size=None):
+    tasks = queue.Queue(maxsize=queue_size or workers * 2)
+    stop = object()
+    done = []
+    lock = threading.Lock()
+    buffer = get_log_buffer()
+
+    def worker():
+        # 与生产者线程共用日志缓冲，保证同一任务的输出集中在一起
+        set_log_buffer(buffer)
+        while True:
+            item = tasks.get()
+            if item is stop:
+                return
+            try:
+                if handle(item):
+                    with lock:
+                        done.append(item)
+            except Exception as e:
+                log(f"处理 {item} 时发生错误: {e}")
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    count = 0
+    try:
+        for item in items:
+            tasks.put(item)
+            count += 1
+    finally:
+        for _ in threads:
+            tasks.put(stop)
+        for thread in threads:
+            thread.join()
+    return done, count
@@ -0,0 +1,81 @@
+import unittest
+from filters import FilterRules, ResourceIndex
+from records import Resource
+
+# 过滤规则的单元测试：边查询边删除使用的 FilterRules.matches 与生成计划使用的 ResourceIndex.select
+# 对同一组资源必须给出相同的结果，include中的条件只选中确认满足的资源（没有对应字段的资源不选中）
+
+NOW = 1_700_000_000
+HOUR = 3600
+
+RECORDS = [
+    Resource('uhost-1', 'UHost', 'r1', vpc='uvnet-1', subnet='subnet-1', tag='Default', name='probe-1', created=NOW - 5 * HOUR),
+    Resource('uhost-2', 'UHost', 'r1', vpc='uvnet-2', subnet='subnet-2', tag='keep', name='prod-1', created=NOW - 5 * HOUR),
+    Resource('udisk-1', 'UDisk', 'r1', parent='uhost-1', tag='Default', name='probe-disk', created=NOW - 2 * HOUR),
+    Resource('udisk-2', 'UDisk', 'r1', parent='uhost-2', tag='Default', name='probe-disk', created=NOW - 2 * HOUR),
+    Resource('udisk-3', 'UDisk', 'r1', tag='Default', name='probe-disk', created=NOW - 2 * HOUR),
+    Resource('eip-1', 'EIP', 'r1', parent='uhost-1', tag='Default'),
+    Resource('eip-2', 'EIP', 'r1'),
+    Resource('subnet-1', '子网', 'r1', vpc='uvnet-1', name='probe-subnet'),
+    Resource('uvnet-1', 'VPC', 'r1', vpc='uvnet-1', tag='Default', created=NOW - 10 * HOUR),
+]
+
+class FilterRulesTest(unittest.TestCase):
+    # 分别按 matches 和 select 选出资源ID，两者一致时返回结果
+    def select(self, include=None, exclude=None, remember=True):
+        rules = FilterRules(include, exclude)
+        index = ResourceIndex()
+        for record in RECORDS:
+            if remember:
+                rules.remember(record)
+            index.add(record)
+        matched = [record.id for record in RECORDS if rules.matches(record, NOW)]
+        self.assertEqual(matched, index.select(rules, NOW))
+        return matched
+
+    def test_empty_rules_select_everything(self):
+        self.assertEqual(self.select(), [record.id for record in RECORDS])
+
+    def test_include_vpc_resolves_attached_resources(self):
+        self.assertEqual(self.select({'vpc_ids': ['uvnet-1']}), ['uhost-1', 'udisk-1', 'eip-1', 'subnet-1', 'uvnet-1'])
+
+    def test_include_vpc_skips_unattached_resources(self):
+        selected = self.select({'vpc_ids': ['uvnet-2']})
+        self.assertEqual(selected, ['uhost-2', 'udisk-2'])
+        self.assertNotIn('udisk-3', selected)
+        self.assertNotIn('eip-2', selected)
+
+    def test_include_tags_skips_untagged(self):
+        self.assertEqual(self.select({'tags': ['Default']}), ['uhost-1', 'udisk-1', 'udisk-2', 'udisk-3', 'eip-1', 'uvnet-1'])
+
+    def test_include_name_prefix_skips_unnamed(self):
+        self.assertEqual(self.select({'name_prefixes': ['probe-']}),
+                         ['uhost-1', 'udisk-1', 'udisk-2', 'udisk-3', 'subnet-1'])
+
+    def test_include_age_skips_resources_without_create_time(self):
+        self.assertEqual(self.select({'min_age_hours': 3}), ['uhost-1', 'uhost-2', 'uvnet-1'])
+        self.assertEqual(self.select({'max_age_hours': 3}), ['udisk-1', 'udisk-2', 'udisk-3'])
+
+    def test_include_criteria_all_required(self):
+        self.assertEqual(self.select({'vpc_ids': ['uvnet-1'], 'tags': ['Default'], 'name_prefixes': ['probe-']}),
+                         ['uhost-1', 'udisk-1'])
+
+    def test_exclude_vpc_protects_attached_resources(self):
+        self.assertEqual(self.select(exclude={'vpc_ids': ['uvnet-1']}), ['uhost-2', 'udisk-2', 'udisk-3', 'eip-2'])
+
+    def test_exclude_vpc_protects_resources_with_unknown_owner(self):
+        # 未查询UHost时（断点续跑或按缓存跳过）无法确认挂载的UDisk、EIP所属的VPC，不删除
+        selected = self.select(exclude={'vpc_ids': ['uvnet-1']}, remember=False)
+        self.assertNotIn('udisk-1', selected)
+        self.assertNotIn('eip-1', selected)
+        self.assertEqual(selected, ['uhost-2', 'udisk-3', 'eip-2'])
+
+    def test_exclude_missing_field_does_not_exclude(self):
+        self.assertEqual(self.select(exclude={'tags': ['keep']}),
+                         [record.id for record in RECORDS if record.id != 'uhost-2'])
+
+    def test_include_and_exclude(self):
+        self.assertEqual(self.select({'tags': ['Default']}, {'ids': ['udisk-2'], 'vpc_ids': ['uvnet-1']}), ['udisk-3'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import random
+import threading
+import unittest
+import async_client
+import common
+from async_client import list_resources_async
+from common import list_resources
+from retry_policy import ApiError
+
+# 分页查询的单元测试：边查询边删除时，删除在之后的若干次查询中才生效，分页的偏移量随之变化，
+# list_resources 和 list_resources_async 仍须返回全部资源
+
+COUNT = 21
+PAGE_CAP = 7
+
+# 模拟查询接口：每页最多返回PAGE_CAP个，删除在之后第delay次查询时才生效
+class ShrinkingPages:
+    def __init__(self, count=COUNT, total_offset=0):
+        self.items = [f"res-{i}" for i in range(count)]
+        self.total_offset = total_offset
+        self.calls = 0
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def delete(self, resource_id, delay):
+        with self.lock:
+            self.pending.append((self.calls + delay, resource_id))
+
+    def fetch_page(self, offset, limit):
+        with self.lock:
+            self.calls += 1
+            for due, resource_id in [entry for entry in self.pending if entry[0] <= self.calls]:
+                self.pending.remove((due, resource_id))
+                self.items.remove(resource_id)
+            page = self.items[offset:offset + min(limit, PAGE_CAP)]
+            return {'TotalCount': len(self.items) + self.total_offset, 'Set': [{'Id': resource_id} for resource_id in page]}
+
+class ListResourcesTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (common.LIST_RETRY_INTERVAL, async_client.LIST_RETRY_INTERVAL)
+        common.LIST_RETRY_INTERVAL = async_client.LIST_RETRY_INTERVAL = 0
+
+    def tearDown(self):
+        common.LIST_RETRY_INTERVAL, async_client.LIST_RETRY_INTERVAL = self.saved
+
+    def test_lists_everything_while_deleting(self):
+        for seed in range(300):
+            rng = random.Random(seed)
+            server = ShrinkingPages()
+            listed = []
+            for item in list_resources(server.fetch_page, 'Set', 'Id', 10, max_workers=1):
+                listed.append(item['Id'])
+                server.delete(item['Id'], rng.randint(1, 4))
+            self.assertEqual(sorted(listed), sorted(f"res-{i}" for i in range(COUNT)), f"seed {seed}")
+            self.assertEqual(len(listed), len(set(listed)))
+
+    def test_lists_everything_while_deleting_async(self):
+        async def run(seed):
+            rng = random.Random(seed)
+            server = ShrinkingPages()
+
+            async def fetch_page(offset, limit):
+                await asyncio.sleep(0)
+                return server.fetch_page(offset, limit)
+
+            listed = []
+            async for item in list_resources_async(fetch_page, 'Set', 'Id', 10):
+                listed.append(item['Id'])
+                server.delete(item['Id'], rng.randint(1, 4))
+            return listed
+
+        for seed in range(300):
+            listed = asyncio.run(run(seed))
+            self.assertEqual(sorted(listed), sorted(f"res-{i}" for i in range(COUNT)), f"seed {seed}")
+
+    def test_single_page_without_total(self):
+        def fetch_page(offset, limit):
+            return {'Set': [{'Id': 'a'}, {'Id': 'b'}]}
+        self.assertEqual([item['Id'] for item in list_resources(fetch_page, 'Set', 'Id', 10)], ['a', 'b'])
+
+    def test_incomplete_listing_raises(self):
+        # TotalCount始终多于实际返回的资源数，超过等待时间后抛出ApiError，而不是当作已查询完整
+        saved = common.LIST_SETTLE_TIMEOUT
+        common.LIST_SETTLE_TIMEOUT = 0
+        try:
+            server = ShrinkingPages(total_offset=1)
+            with self.assertRaises(ApiError):
+                list(list_resources(server.fetch_page, 'Set', 'Id', 10))
+        finally:
+            common.LIST_SETTLE_TIMEOUT = saved
+
+if __name__ == '__main__':
+    unittest.main()
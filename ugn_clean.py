@@ -1,143 +1,159 @@
-import sys
 import time
-import requests
-from common import get_common_headers
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from common import api_url, get_common_headers, post_request, list_resources, batch_execute, wait_until, log, start_log_buffer, stop_log_buffer
 from urllib.parse import urlencode
+from retry_policy import ApiError, succeeded
 
-def usage():
-    print("Usage: python ugn_clean.py <ProjectId> <Region> <Zone>")
-    print("Example: python ugn_clean.py org-xxxxx cn-bj2 cn-bj2-01")
-    sys.exit(1)
+# UGN 清理运行报告的默认输出文件
+REPORT_FILE = 'ugn_report.json'
 
-if len(sys.argv) != 4:
-    usage()
+# 同时处理的 UGN 数量
+UGN_WORKERS = 16
 
-PROJECT_ID, REGION, ZONE = sys.argv[1:4]
+def list_ugns(project_id, region, zone):
+    url = api_url('ListUGN')
 
-def list_ugns():
-    url = 'https://api.ucloud.cn/?Action=ListUGN'
-    all_ugns = []
-    offset = 0
-    limit = 100  
-    while True:
+    def fetch_page(offset, limit):
         payload = {
-            "ProjectId": PROJECT_ID,
-            "Zone": ZONE,
-            "Region": REGION,
+            "ProjectId": project_id,
+            "Zone": zone,
+            "Region": region,
             "Limit": limit,
             "Offset": offset,
             "Action": "ListUGN",
             "_timestamp": int(time.time() * 1000)
         }
-        resp = requests.post(url, headers=get_common_headers(), json=payload)
-        try:
-            data = resp.json()
-        except Exception:
-            print("查询 UGN 列表失败:", resp.text)
-            sys.exit(1)
-        if 'UGNs' not in data or not data['UGNs']:
-            break
-        all_ugns.extend([ugn['UGNID'] for ugn in data['UGNs']])
-        if len(data['UGNs']) < limit:
-            break
-        offset += limit
-    if not all_ugns:
-        print("未找到任何 UGN")
-        sys.exit(0)
-    return list(set(all_ugns))
-
-def get_networks(ugnid):
-    url = 'https://api.ucloud.cn/?Action=GetUGNNetworks'
+        return post_request(url, json_body=payload)
+
+    # 根据 TotalCount 并发获取剩余分页
+    return [ugn['UGNID'] for ugn in list_resources(fetch_page, 'UGNs', 'UGNID', 100)]
+
+def get_networks(project_id, region, zone, ugnid):
+    url = api_url('GetUGNNetworks')
     payload = {
-        "ProjectId": PROJECT_ID,
-        "Zone": ZONE,
-        "Region": REGION,
+        "ProjectId": project_id,
+        "Zone": zone,
+        "Region": region,
         "UGNID": ugnid,
         "Action": "GetUGNNetworks",
         "_timestamp": int(time.time() * 1000)
     }
-    resp = requests.post(url, headers=get_common_headers(), json=payload)
-    try:
-        data = resp.json()
-    except Exception:
-        print("查询 UGN 绑定网络实例失败:", resp.text)
-        return []
+    data = post_request(url, json_body=payload)
+    if not succeeded(data):
+        log(f"查询 UGN {ugnid} 绑定网络实例失败")
+        return None
     return [net['NetworkID'] for net in data.get('Networks', [])]
 
-def detach_networks(ugnid, networks):
-    url = 'https://api.ucloud.cn/?Action=DetachUGNNetworks'
+def detach_networks(project_id, region, ugnid, networks):
+    url = api_url('DetachUGNNetworks')
     params = {
-        "ProjectId": PROJECT_ID,
-        "Region": REGION,
+        "ProjectId": project_id,
+        "Region": region,
         "UGNID": ugnid,
         "Action": "DetachUGNNetworks",
         "_timestamp": int(time.time() * 1000)
     }
-    for i, net in enumerate(networks):
-        params[f'Networks[{i}]'] = net
 
     # 获取通用头部，并设置正确的 Content-Type
-    headers = get_common_headers().copy()
+    headers = get_common_headers()
     headers['Content-Type'] = 'application/x-www-form-urlencoded; charset=UTF-8'
 
-    resp = requests.post(url, headers=headers, data=urlencode(params))
-    try:
-        data = resp.json()
-        if data.get('RetCode', 0) != 0:
-            print(f"解绑失败: {data}")
-        else:
-            print("解绑成功")
-    except Exception:
-        print(f"解绑请求异常: {resp.text}")
+    def call(data):
+        return post_request(url, urlencode(data), headers)
+
+    # 网络实例按批合并为 Networks[i] 参数，批量失败时逐个重试以定位失败的实例
+    results = batch_execute(call, params, 'Networks[0]', networks)
+    failed = [net for net, ok in results.items() if not ok]
+    if failed:
+        log(f"解绑失败: {', '.join(failed)}")
+    else:
+        log("解绑成功")
 
-def del_ugn(ugnid, retry=3):
-    url = 'https://api.ucloud.cn/?Action=DelUGN'
+# 删除 UGN；仍绑定网络实例、限流等可恢复的错误由 post_request 按重试策略重试
+def del_ugn(project_id, region, zone, ugnid):
+    url = api_url('DelUGN')
     payload = {
-        "ProjectId": PROJECT_ID,
-        "Zone": ZONE,
-        "Region": REGION,
+        "ProjectId": project_id,
+        "Zone": zone,
+        "Region": region,
         "UGNID": ugnid,
         "Action": "DelUGN",
         "_timestamp": int(time.time() * 1000)
     }
-    for attempt in range(1, retry + 1):
-        resp = requests.post(url, headers=get_common_headers(), json=payload)
-        try:
-            data = resp.json()
-            if data.get('RetCode', 0) == 0:
-                print(f"UGN {ugnid} 删除成功")
-                return True
-            else:
-                print(f"删除失败: {ugnid}, 返回: {data}，第{attempt}次重试")
-                time.sleep(2)
-        except Exception:
-            print(f"删除请求异常: {ugnid}, {resp.text}，第{attempt}次重试")
-            time.sleep(2)
-    print(f"UGN {ugnid} 删除最终失败，请手动检查！")
-    return False       
-
-def main():
-    ugns = list_ugns()
-    print("找到以下 UGN：")
-    print('\n'.join(ugns))
-    # 遍历每个 UGN 进行解绑和删除操作
-    for ugnid in ugns:
-        time.sleep(1)
-        print(f"正在解绑 UGN: {ugnid}")
-        networks = get_networks(ugnid)
+    if succeeded(post_request(url, json_body=payload)):
+        log(f"UGN {ugnid} 删除成功")
+        return True
+    log(f"UGN {ugnid} 删除最终失败，请手动检查！")
+    return False
+
+# 单个 UGN 的完整流程：查询绑定网络 -> 解绑 -> 确认解绑生效 -> 删除，返回(是否删除成功, 日志)
+def clean_ugn(project_id, region, zone, ugnid):
+    start_log_buffer()
+    ok = False
+    try:
+        log(f"正在解绑 UGN: {ugnid}")
+        networks = get_networks(project_id, region, zone, ugnid)
+        if networks is None:
+            return ok, stop_log_buffer()
         if not networks:
-            print("未找到任何 UGN 绑定网络实例")
-            continue
-        detach_networks(ugnid, networks)
-        print("解绑完成...")
-    print("所有 UGN 解绑 VPC 操作已完成！")
-    # 删除所有 UGN
-    for ugnid in ugns:
-        time.sleep(1)
-        print(f"正在删除 UGN: {ugnid}")
-        del_ugn(ugnid)
-        print("删除完成...")
-    print("所有 UGN 删除操作已完成！")
+            log("未找到任何 UGN 绑定网络实例")
+        else:
+            detach_networks(project_id, region, ugnid, networks)
+            # 轮询确认解绑生效，避免随后删除 UGN 时因仍有绑定而失败
+            if not wait_until(lambda: get_networks(project_id, region, zone, ugnid) == [], timeout=120):
+                log(f"等待 UGN {ugnid} 解绑超时")
+            log("解绑完成...")
+        log(f"正在删除 UGN: {ugnid}")
+        ok = del_ugn(project_id, region, zone, ugnid)
+    except Exception as e:
+        log(f"处理 UGN {ugnid} 时发生错误: {e}")
+    return ok, stop_log_buffer()
+
+# 并发清理多个地域的 UGN：各地域的 UGN 列表并发查询，每个 UGN 查询到后立即独立执行解绑和删除
+# targets 为 [(Region, Zone), ...]
+def main(project_id, targets, workers=UGN_WORKERS):
+    results = {region: [0, 0] for region, _ in targets}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        listings = {executor.submit(list_ugns, project_id, region, zone): (region, zone) for region, zone in targets}
+        cleanups = {}
+        for future in as_completed(listings):
+            region, zone = listings[future]
+            try:
+                ugns = future.result()
+            except ApiError as e:
+                print(f"查询地域 {region} 的 UGN 列表失败: {e}")
+                continue
+            if not ugns:
+                print(f"地域 {region} 未找到任何 UGN")
+                continue
+            print(f"地域 {region} 找到以下 UGN：")
+            print('\n'.join(ugns))
+            for ugnid in ugns:
+                cleanups[executor.submit(clean_ugn, project_id, region, zone, ugnid)] = region
+
+        # 每个 UGN 完成后整块输出其日志，避免并发输出交错
+        for future in as_completed(cleanups):
+            region = cleanups[future]
+            ok, lines = future.result()
+            results[region][0 if ok else 1] += 1
+            print('\n'.join(lines))
+            print("处理完成...")
+
+    print("\n================ UGN 删除汇总 ================")
+    for region, (ok_count, failed_count) in results.items():
+        if ok_count or failed_count:
+            print(f"{region}: 成功 {ok_count} 个，失败 {failed_count} 个")
+    print("所有 UGN 解绑和删除操作已完成！")
+
+# 从 region.json 读取所有地域
+def load_targets():
+    from main import load_regions
+    regions_data = load_regions()
+    if regions_data is None:
+        return None
+    return [(info['Region'], info['Zone']) for info in regions_data.values()]
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    import sys
+    from cli import run
+    sys.exit(run(['ugn', *sys.argv[1:]]))
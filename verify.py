@@ -0,0 +1,107 @@
+import os
+from common import get_common_headers
+from filters import get_filter
+from inventory import InventoryCache, CACHE_FILE
+from journal import Journal, JOURNAL_FILE
+from main import RESOURCE_GRAPH, MAX_WORKERS, collect_result, planned_ids, sweep_resource
+from plan import discover
+from scheduler import run_graph
+
+# 删除后的校验：并发重新查询所有地域的全部资源，与删除计划（未指定计划时为满足过滤规则的全部资源）比较，
+# 仍然存在的资源即为残留，连同最近一次删除失败的原因一起输出。残留记入断点日志，--resume 时会重新删除；
+# 指定requeue时立即只针对残留资源重新执行一轮删除，再校验一次
+
+# 查询仍然存在、本应被删除的资源，返回 ({地域: {资源类型: [资源ID]}}, 查询失败的资源类型)；
+# only指定时只检查其中的资源（重新删除后的校验）
+def find_leaks(project_id, regions_data, headers, plan=None, only=None):
+    found, errors, _ = discover(project_id, regions_data, headers, get_filter())
+    leaks = {}
+    for region, resources in found.items():
+        for name, ids in resources.items():
+            if only is not None:
+                expected = only.get(region, {}).get(name, [])
+            else:
+                expected = None if plan is None else planned_ids(plan, region, name)
+            if expected is not None:
+                expected = set(expected)
+                ids = [resource_id for resource_id in ids if resource_id in expected]
+            if ids:
+                leaks.setdefault(region, {})[name] = ids
+    return leaks, errors
+
+# 残留资源的数量
+def leak_count(leaks):
+    return sum(len(ids) for resources in leaks.values() for ids in resources.values())
+
+# 把残留资源记入断点日志，保留最近一次删除失败的原因
+def record_leaks(journal, regions_data, leaks):
+    for region, resources in leaks.items():
+        actual = regions_data[region]['Region']
+        for name, ids in resources.items():
+            for resource_id in ids:
+                journal.record(actual, name, resource_id, 'verify', 'leaked', journal.last_error(actual, name, resource_id))
+
+# 只针对残留资源按依赖关系重新执行一轮删除
+def requeue_leaks(project_id, regions_data, headers, leaks, journal, max_workers=MAX_WORKERS):
+    graph = {}
+    for region in leaks:
+        for name, (_, deps) in RESOURCE_GRAPH.items():
+            graph[(region, name)] = [(region, dep) for dep in deps]
+    results = {region: {'counts': {}, 'errors': []} for region in leaks}
+
+    def run(node):
+        region, name = node
+        ids = leaks[region].get(name)
+        if not ids:
+            return None
+        return sweep_resource(project_id, region, regions_data[region], name, headers, journal, ids=ids)
+
+    def on_done(node, result):
+        if result is not None:
+            collect_result(regions_data, results, node, result)
+
+    run_graph(graph, run, max_workers, on_done)
+    return results
+
+# 输出校验结果
+def print_leaks(regions_data, leaks, errors, journal):
+    print(f"\n\n================ 删除校验 ================")
+    for region in regions_data:
+        actual = regions_data[region]['Region']
+        resources = leaks.get(region, {})
+        if resources:
+            counts = '，'.join(f"{name}: {len(ids)}" for name, ids in resources.items())
+            print(f"{region}: 残留 {counts}")
+        elif not errors.get(region):
+            print(f"{region}: 已全部删除")
+        for name, ids in resources.items():
+            for resource_id in ids:
+                print(f"  {name} {resource_id}: {journal.last_error(actual, name, resource_id) or '没有删除失败的记录'}")
+        for name, error in errors.get(region, {}).items():
+            print(f"  错误: {name}查询失败，无法校验: {error}")
+    print(f"==========================================\n")
+
+# 校验删除结果并返回残留资源 {地域: {资源类型: [资源ID]}}；state_dir为断点日志和空资源类型缓存所在的目录
+def verify_sweep(project_id, regions_data, plan=None, requeue=False, state_dir='.', max_workers=MAX_WORKERS):
+    headers = get_common_headers()
+    print("\n正在校验删除结果...")
+    leaks, errors = find_leaks(project_id, regions_data, headers, plan)
+    journal = Journal(os.path.join(state_dir, JOURNAL_FILE), resume=True, project_id=project_id)
+    try:
+        record_leaks(journal, regions_data, leaks)
+        if leaks and requeue:
+            print(f"重新删除 {leak_count(leaks)} 个残留资源...")
+            requeue_leaks(project_id, regions_data, headers, leaks, journal, max_workers)
+            leaks, errors = find_leaks(project_id, regions_data, headers, plan, only=leaks)
+            record_leaks(journal, regions_data, leaks)
+        print_leaks(regions_data, leaks, errors, journal)
+    finally:
+        journal.close()
+    # 这些资源类型不再确认为空，下次运行时重新查询
+    if leaks and plan is None:
+        cache = InventoryCache(os.path.join(state_dir, CACHE_FILE), scope=get_filter().fingerprint())
+        for region, resources in leaks.items():
+            for name in resources:
+                cache.invalidate(project_id, regions_data[region]['Region'], name)
+        cache.save()
+    return leaks
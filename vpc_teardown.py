@@ -0,0 +1,128 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from common import configure_client, get_common_headers, wait_until, log
+from filters import FilterRules
+from main import RESOURCE_GRAPH, load_regions
+from plan import PLAN_WORKERS, index_resources, iter_records, make_plan
+from ratelimit import CONCURRENCY
+from records import ResourceStore
+from retry_policy import ApiError
+from ugn_clean import list_ugns, get_networks, detach_networks
+
+# 按所属VPC查找的资源类型
+VPC_MEMBERS = ('UHost', 'ALB', 'NATGW', '虚拟网卡', '子网', 'VPC')
+# 按挂载的资源查找的资源类型：挂在UHost上的UDisk，绑定在UHost、ALB、NATGW上的EIP
+ATTACHED = {'UDisk': ('UHost',), 'EIP': ('UHost', 'ALB', 'NATGW')}
+# 等待UGN解绑生效的最长时间（秒）
+DETACH_TIMEOUT = 120
+
+# 查询各地域中存在的指定VPC，返回 {地域: [VPC ID]}
+def locate_vpcs(project_id, regions_data, vpc_ids, headers):
+    wanted = set(vpc_ids)
+    rules = FilterRules()
+    with ThreadPoolExecutor(max_workers=PLAN_WORKERS) as executor:
+        futures = {region: executor.submit(index_resources, project_id, info['Region'], 'VPC', headers, rules)
+                   for region, info in regions_data.items()}
+        located = {}
+        for region, future in futures.items():
+            vpcs = [vpc for vpc in future.result().ids if vpc in wanted]
+            if vpcs:
+                located[region] = vpcs
+    return located
+
+# 查询绑定了指定VPC的UGN，返回 {UGN ID: [需要解绑的VPC ID]}
+def ugn_attachments(project_id, region, zone, vpcs):
+    ugns = list_ugns(project_id, region, zone)
+    with ThreadPoolExecutor(max_workers=PLAN_WORKERS) as executor:
+        networks = dict(zip(ugns, executor.map(lambda ugnid: get_networks(project_id, region, zone, ugnid), ugns)))
+    attachments = {}
+    for ugnid, bound in networks.items():
+        if bound is None:
+            raise ApiError(f"查询 UGN {ugnid} 绑定网络实例失败")
+        detach = [network for network in bound if network in vpcs]
+        if detach:
+            attachments[ugnid] = detach
+    return attachments
+
+# 查询一个地域内依赖指定VPC的全部资源，返回 {资源类型: [资源ID]} 和需要解绑的UGN；各类资源解析为资源记录
+# 放入同一个 ResourceStore，按所属VPC、子网和挂载的资源查找。所有资源类型都有对应的列表（可能为空），执行时不会再查询整个地域
+def resolve_region(project_id, region_info, vpcs, headers):
+    region, zone = region_info['Region'], region_info['Zone']
+    vpc_set = set(vpcs)
+    in_vpcs = FilterRules(include={'vpc_ids': vpcs})
+
+    def fetch(name, rules):
+        return list(iter_records(project_id, region, name, headers, rules))
+
+    store = ResourceStore()
+    with ThreadPoolExecutor(max_workers=PLAN_WORKERS) as executor:
+        fetches = [executor.submit(fetch, name, in_vpcs) for name in VPC_MEMBERS]
+        fetches += [executor.submit(fetch, name, FilterRules()) for name in ATTACHED]
+        ugns = executor.submit(ugn_attachments, project_id, region, zone, vpc_set)
+        for future in fetches:
+            for record in future.result():
+                store.add(record)
+        ugn_networks = ugns.result()
+    # 只取确认属于这些VPC的资源（含没有VPC字段、但位于这些VPC的子网中的资源），没有VPC和子网字段的资源不会被选中
+    subnets = store.in_vpcs(vpc_set, '子网')
+    resources = {}
+    for name in VPC_MEMBERS:
+        members = dict.fromkeys(store.in_vpcs(vpc_set, name))
+        members.update(dict.fromkeys(store.in_subnets(subnets, name)))
+        resources[name] = list(members)
+    for name, owners in ATTACHED.items():
+        resources[name] = store.attached_to([owner for kind in owners for owner in resources[kind]], name)
+    return {name: resources[name] for name in RESOURCE_GRAPH}, ugn_networks
+
+# 生成只删除指定VPC及其关联资源的删除计划，格式与 plan.py 生成的计划相同，另外记录需要解绑的UGN；
+# 任一查询失败时返回None，避免执行时退回到删除整个地域的资源
+def build_vpc_plan(project_id, vpc_ids, regions_data=None):
+    if regions_data is None:
+        regions_data = load_regions()
+        if regions_data is None:
+            return None
+    configure_client(pool_size=CONCURRENCY)
+    headers = get_common_headers()
+    started = time.monotonic()
+    try:
+        located = locate_vpcs(project_id, regions_data, vpc_ids, headers)
+        missing = set(vpc_ids) - {vpc for vpcs in located.values() for vpc in vpcs}
+        if missing:
+            print(f"警告: 以下VPC在 region.json 的地域中不存在: {', '.join(sorted(missing))}")
+        if not located:
+            print("错误: 未找到任何指定的VPC")
+            return None
+        with ThreadPoolExecutor(max_workers=len(located)) as executor:
+            futures = {region: executor.submit(resolve_region, project_id, regions_data[region], vpcs, headers)
+                       for region, vpcs in located.items()}
+            resolved = {region: future.result() for region, future in futures.items()}
+    except ApiError as e:
+        print(f"错误: 查询VPC关联资源失败: {e}")
+        return None
+    found = {region: resources for region, (resources, _) in resolved.items()}
+    ugn_networks = {region: attachments for region, (_, attachments) in resolved.items() if attachments}
+    scoped = {region: regions_data[region] for region in located}
+    return make_plan(project_id, scoped, found, {}, started, vpc_ids=sorted(set(vpc_ids) - missing), ugn_networks=ugn_networks)
+
+# 解绑单个UGN与指定VPC，并等待解绑生效
+def detach_ugn(project_id, region, zone, ugnid, networks):
+    detach_networks(project_id, region, ugnid, networks)
+
+    def detached():
+        bound = get_networks(project_id, region, zone, ugnid)
+        return bound is not None and not set(bound) & set(networks)
+
+    if not wait_until(detached, timeout=DETACH_TIMEOUT):
+        log(f"等待 UGN {ugnid} 解绑超时")
+        return False
+    log(f"UGN {ugnid} 已解绑 {', '.join(networks)}")
+    return True
+
+# 执行计划前并发解绑计划中记录的UGN，否则VPC因仍绑定UGN而无法删除
+def detach_planned_ugns(project_id, plan):
+    jobs = [(plan['regions'][region], ugnid, networks)
+            for region, attachments in plan.get('ugn_networks', {}).items() for ugnid, networks in attachments.items()]
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=PLAN_WORKERS) as executor:
+        list(executor.map(lambda job: detach_ugn(project_id, job[0]['Region'], job[0]['Zone'], *job[1:]), jobs))